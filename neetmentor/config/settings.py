@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -51,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -138,6 +140,88 @@ STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Uploaded note images (content-addressed, see core.blobs)
+MEDIA_ROOT = Path(os.getenv('MEDIA_ROOT', BASE_DIR / 'media'))
+BLOB_STORE_ROOT = MEDIA_ROOT / 'blobs'
+BLOB_MAX_BYTES = int(os.getenv('BLOB_MAX_BYTES', 10 * 1024 * 1024))
+# Variants: originals larger than this are never decoded (the original is
+# served instead), and at most this many render at once per process
+BLOB_MAX_PIXELS = int(os.getenv('BLOB_MAX_PIXELS', 40_000_000))
+BLOB_VARIANT_WORKERS = int(os.getenv('BLOB_VARIANT_WORKERS', 2))
+# purge_expired removes blobs no note references once they are this old,
+# which is how long a direct upload has to be attached to a note
+BLOB_ORPHAN_GRACE_HOURS = int(os.getenv('BLOB_ORPHAN_GRACE_HOURS', 24))
+# Precompiled question sets (build_question_snapshots)
+SNAPSHOT_ROOT = MEDIA_ROOT / 'snapshots'
+
+# Delta sync (core.sync): how long deletions are remembered. Clients with an
+# older sync token get a full resync.
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv('SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+
+# Unverified signups (PreRegistration): the OTP is valid this long after the
+# last (re)send; purge_expired deletes the rows afterwards.
+PREREGISTRATION_TTL_MINUTES = int(os.getenv('PREREGISTRATION_TTL_MINUTES', 30))
+
+# Server-sent events (core.events). LocalBroker only reaches subscribers in
+# the same process, so it is refused with more than one web worker
+# (WEB_CONCURRENCY, which gunicorn reads); on Postgres the default is
+# PostgresBroker. A stream is opened with a ticket from /events/ticket/,
+# valid for EVENTS_TICKET_SECONDS, and runs EVENTS_STREAM_MINUTES before the
+# client reconnects with a new one.
+EVENTS_BACKEND = os.getenv('EVENTS_BACKEND', (
+    'core.events.PostgresBroker' if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql'
+    else 'core.events.LocalBroker'
+))
+if EVENTS_BACKEND == 'core.events.LocalBroker' and int(os.getenv('WEB_CONCURRENCY', 1)) > 1:
+    raise ImproperlyConfigured('EVENTS_BACKEND=core.events.LocalBroker cannot reach subscribers in other workers')
+EVENTS_HEARTBEAT_SECONDS = int(os.getenv('EVENTS_HEARTBEAT_SECONDS', 15))
+EVENTS_TICKET_SECONDS = int(os.getenv('EVENTS_TICKET_SECONDS', 60))
+EVENTS_STREAM_MINUTES = int(os.getenv('EVENTS_STREAM_MINUTES', 30))
+
+# Request metrics (core.metrics). Latency and size are recorded for every
+# request; query count and DB time for this fraction of them. /metrics needs
+# "Authorization: Bearer $METRICS_TOKEN", or DEBUG when no token is set.
+METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', 0.1))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_SERVER_TIMING = os.getenv('METRICS_SERVER_TIMING', 'True') == 'True'
+
+# Caches. Catalogue responses default to an in-process LRU; point
+# CATALOGUE_CACHE_URL at Redis to share them between workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalogue': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'catalogue',
+        'TIMEOUT': 3600,
+        'OPTIONS': {'MAX_ENTRIES': 500},
+    },
+}
+if os.getenv('CATALOGUE_CACHE_URL'):
+    CACHES['catalogue'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('CATALOGUE_CACHE_URL'),
+        'TIMEOUT': 3600,
+    }
+CATALOGUE_CACHE_ALIAS = 'catalogue'
+
+# Slim request.user records (core.authentication). Per process by default;
+# AUTH_CACHE_URL shares them, so invalidation on save reaches every worker.
+CACHES['auth'] = {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'auth',
+    'TIMEOUT': int(os.getenv('AUTH_USER_CACHE_SECONDS', 60)),
+    'OPTIONS': {'MAX_ENTRIES': 10000},
+}
+if os.getenv('AUTH_CACHE_URL'):
+    CACHES['auth'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('AUTH_CACHE_URL'),
+        'TIMEOUT': int(os.getenv('AUTH_USER_CACHE_SECONDS', 60)),
+    }
+AUTH_USER_CACHE_ALIAS = 'auth'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -145,15 +229,36 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
 
+AUTHENTICATION_BACKENDS = ['core.backends.PooledHashBackend']
+
+# Password hashing pool (core.hashing), per web process. 0 hashes inline.
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', 16))  # in-flight hashes before answering 503
+
 # Email Settings for Production (Resend)
 RESEND_API_KEY = os.getenv('RESEND_API_KEY')
 DEFAULT_FROM_EMAIL = 'onboarding@resend.dev' # Default for unverified domains
 if os.getenv('EMAIL_HOST_USER'):
     DEFAULT_FROM_EMAIL = f"NEETMentor <{os.getenv('EMAIL_HOST_USER')}>"
 
+# SMTP delivery when RESEND_API_KEY is unset. For local testing point it at a
+# stand-in such as `python -m aiosmtpd -n -l localhost:1025`.
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'False') == 'True'
+EMAIL_TIMEOUT = int(os.getenv('EMAIL_TIMEOUT', 10))
+
+# Outbox worker (manage.py send_outbox)
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 6))
+EMAIL_OUTBOX_RETRY_SECONDS = int(os.getenv('EMAIL_OUTBOX_RETRY_SECONDS', 30))  # doubles per attempt
+EMAIL_OUTBOX_RETENTION_DAYS = int(os.getenv('EMAIL_OUTBOX_RETENTION_DAYS', 7))
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -173,6 +278,13 @@ CORS_ALLOW_METHODS = list(default_methods) + [
     'PATCH',
 ]
 
+from corsheaders.defaults import default_headers
+CORS_ALLOW_HEADERS = list(default_headers) + [
+    'if-match',
+    'x-client-id',
+]
+CORS_EXPOSE_HEADERS = ['ETag']
+
 # Render / Production Settings
 # Trust the X-Forwarded-Proto header for SSL (Render terminates SSL at load balancer)
 ALLOWED_HOSTS = ['*']
@@ -21,11 +21,12 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
 
-from core.views import LoginView
+from core.views import LoginView, metrics_endpoint
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('core.urls')),
     path('api/token/', LoginView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('metrics', metrics_endpoint, name='metrics'),
 ]
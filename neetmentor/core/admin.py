@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User, UserStorage, Subject, Topic, Question, UserAttempt, UserProgress, StudyLog, MockTestResult, UserNote, StudyTask, QuizAttempt
+from .models import User, UserStorage, UserStorageEntry, AnalyticsRollup, Subject, Topic, Question, UserAttempt, UserProgress, SolvedQuestion, StudyLog, MockTestResult, UserNote, StudyTask, QuizAttempt, Blob, StudyLogTombstone, EmailOutbox
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
@@ -10,6 +10,11 @@ class UserStorageAdmin(admin.ModelAdmin):
     list_display = ('user',)
     search_fields = ('user__username',)
 
+@admin.register(UserStorageEntry)
+class UserStorageEntryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'key', 'updated_at')
+    search_fields = ('user__username', 'key')
+
 @admin.register(StudyTask)
 class StudyTaskAdmin(admin.ModelAdmin):
     list_display = ('user', 'topic', 'subject', 'is_done', 'created_at')
@@ -33,8 +38,25 @@ class MockTestResultAdmin(admin.ModelAdmin):
 class QuizAttemptAdmin(admin.ModelAdmin):
     list_display = ('user', 'quiz_name', 'score', 'created_at')
 
+@admin.register(AnalyticsRollup)
+class AnalyticsRollupAdmin(admin.ModelAdmin):
+    list_display = ('user', 'total_questions', 'total_minutes', 'notes_count', 'updated_at')
+    search_fields = ('user__username',)
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ('sha256', 'content_type', 'size', 'created_at')
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('to', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('to',)
+
 admin.site.register(Subject)
 admin.site.register(Topic)
 admin.site.register(Question)
 admin.site.register(UserAttempt)
 admin.site.register(UserProgress)
+admin.site.register(SolvedQuestion)
+admin.site.register(StudyLogTombstone)
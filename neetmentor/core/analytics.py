@@ -0,0 +1,283 @@
+from datetime import datetime, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q, Sum
+
+from .models import AnalyticsRollup, QuizAttempt, StudyLog, UserNote
+from .storage import read_key
+
+SUBJECTS = ['Physics', 'Chemistry', 'Biology']
+
+ROLLUP_FIELDS = (
+    'total_questions', 'correct_answers', 'total_minutes',
+    'daily_minutes', 'subject_stats', 'notes_count',
+)
+
+
+def quiz_aggregates():
+    # One conditional aggregate covers the overall and per-subject sums
+    aggregates = {
+        'questions': Sum('total_questions'),
+        'correct': Sum('correct_answers'),
+    }
+    for sub in SUBJECTS:
+        match = Q(quiz_name__icontains=sub)
+        aggregates[f'{sub}_correct'] = Sum('correct_answers', filter=match)
+        aggregates[f'{sub}_total'] = Sum('total_questions', filter=match)
+    return aggregates
+
+
+def empty_state():
+    return {
+        'total_questions': 0,
+        'correct_answers': 0,
+        'total_minutes': 0,
+        'daily_minutes': {},
+        'subject_stats': {},
+        'notes_count': 0,
+    }
+
+
+def apply_quiz_totals(state, totals):
+    state['total_questions'] += totals['questions'] or 0
+    state['correct_answers'] += totals['correct'] or 0
+    for sub in SUBJECTS:
+        sub_total = totals[f'{sub}_total'] or 0
+        if sub_total:
+            state['subject_stats'][sub] = {
+                'correct': totals[f'{sub}_correct'] or 0,
+                'total': sub_total,
+            }
+
+
+def compute_state(user):
+    # Full recomputation from the source tables, one query per table
+    return compute_states([user.pk])[user.pk]
+
+
+def compute_states(user_ids):
+    states = {user_id: empty_state() for user_id in user_ids}
+
+    quiz_rows = (
+        QuizAttempt.objects.filter(user_id__in=user_ids)
+        .values('user_id')
+        .annotate(**quiz_aggregates())
+    )
+    for row in quiz_rows:
+        apply_quiz_totals(states[row['user_id']], row)
+
+    log_rows = (
+        StudyLog.objects.filter(user_id__in=user_ids)
+        .values('user_id', 'date')
+        .annotate(day_minutes=Sum('minutes'))
+        .values_list('user_id', 'date', 'day_minutes')
+    )
+    for user_id, date, minutes in log_rows:
+        if minutes:
+            states[user_id]['daily_minutes'][date.isoformat()] = minutes
+            states[user_id]['total_minutes'] += minutes
+
+    note_rows = (
+        UserNote.objects.filter(user_id__in=user_ids)
+        .values('user_id')
+        .annotate(count=Count('id'))
+        .values_list('user_id', 'count')
+    )
+    for user_id, count in note_rows:
+        states[user_id]['notes_count'] = count
+
+    return states
+
+
+def rollup_state(rollup):
+    return {field: getattr(rollup, field) for field in ROLLUP_FIELDS}
+
+
+def _locked_rollup(user):
+    return AnalyticsRollup.objects.select_for_update().filter(user=user).first()
+
+
+def _create_rollup(user):
+    # Computed from the source tables, which include the caller's own
+    # uncommitted writes. None if another first writer inserted the row
+    # meanwhile; the caller then locks and updates that one.
+    try:
+        with transaction.atomic():
+            return AnalyticsRollup.objects.create(user=user, **compute_state(user))
+    except IntegrityError:
+        return None
+
+
+def rebuild_rollup(user):
+    # Recomputed under the row lock record_* take, so an increment committed
+    # concurrently is neither lost nor counted twice
+    with transaction.atomic():
+        rollup = _locked_rollup(user)
+        if rollup is None:
+            rollup = _create_rollup(user)
+            if rollup is not None:
+                return rollup
+            rollup = _locked_rollup(user)
+        for field, value in compute_state(user).items():
+            setattr(rollup, field, value)
+        rollup.save()
+        return rollup
+
+
+def get_rollup(user):
+    rollup = AnalyticsRollup.objects.filter(user=user).first()
+    if rollup is None:
+        rollup = rebuild_rollup(user)
+    return rollup
+
+
+def _update_rollup(user, change):
+    # Applies `change(rollup)` under a row lock. A missing rollup is built
+    # from the source tables instead, which already include the change.
+    with transaction.atomic():
+        rollup = _locked_rollup(user)
+        if rollup is None:
+            if _create_rollup(user) is not None:
+                return
+            # Lost the insert race: the winner's totals predate this change
+            rollup = _locked_rollup(user)
+        change(rollup)
+        rollup.save()
+
+
+def record_quiz_attempt(user, attempt, sign=1):
+    def change(rollup):
+        rollup.total_questions += sign * attempt.total_questions
+        rollup.correct_answers += sign * attempt.correct_answers
+        name = (attempt.quiz_name or '').lower()
+        for sub in SUBJECTS:
+            if sub.lower() not in name:
+                continue
+            stats = rollup.subject_stats.get(sub, {'correct': 0, 'total': 0})
+            stats['correct'] += sign * attempt.correct_answers
+            stats['total'] += sign * attempt.total_questions
+            if stats['total']:
+                rollup.subject_stats[sub] = stats
+            else:
+                rollup.subject_stats.pop(sub, None)
+
+    _update_rollup(user, change)
+
+
+def record_study_log(user, log, sign=1):
+    def change(rollup):
+        key = log.date.isoformat()
+        minutes = rollup.daily_minutes.get(key, 0) + sign * log.minutes
+        if minutes:
+            rollup.daily_minutes[key] = minutes
+        else:
+            rollup.daily_minutes.pop(key, None)
+        rollup.total_minutes += sign * log.minutes
+
+    _update_rollup(user, change)
+
+
+def record_note(user, sign=1):
+    def change(rollup):
+        rollup.notes_count += sign
+
+    _update_rollup(user, change)
+
+
+def syllabus_progress(syllabus_data):
+    total_topics = 0
+    completed_topics = 0
+    for subj_data in syllabus_data.values():
+        if isinstance(subj_data, dict):
+            for topic_status in subj_data.values():
+                total_topics += 1
+                if topic_status == 'completed':
+                    completed_topics += 1
+    return total_topics, completed_topics
+
+
+def subject_completion(syllabus_data, sub):
+    sub_topics = syllabus_data.get(sub)
+    if not isinstance(sub_topics, dict) or not sub_topics:
+        return 0
+    c_count = sum(1 for status in sub_topics.values() if status == 'completed')
+    return c_count / len(sub_topics) * 100
+
+
+def compute_analytics(user):
+    today = datetime.now().date()
+    week = [today - timedelta(days=i) for i in range(6, -1, -1)]
+
+    rollup = get_rollup(user)
+
+    syllabus_data = read_key(user, 'syllabus', {})
+    if not isinstance(syllabus_data, dict):
+        syllabus_data = {}
+
+    return build_payload(
+        total_questions=rollup.total_questions,
+        correct_answers=rollup.correct_answers,
+        total_minutes=rollup.total_minutes,
+        daily_minutes=[(date, rollup.daily_minutes.get(date.isoformat(), 0)) for date in week],
+        subject_totals={
+            sub: (stats['correct'], stats['total']) for sub, stats in rollup.subject_stats.items()
+        },
+        notes_count=rollup.notes_count,
+        syllabus_data=syllabus_data,
+    )
+
+
+def build_payload(total_questions, correct_answers, total_minutes, daily_minutes,
+                  subject_totals, notes_count, syllabus_data):
+    # 1. Overall Stats
+    accuracy = (correct_answers / total_questions * 100) if total_questions > 0 else 0
+    study_hours = round(total_minutes / 60, 1)
+
+    # Syllabus Progress (from UserStorage)
+    total_topics, completed_topics = syllabus_progress(syllabus_data)
+    syllabus_percent = (completed_topics / total_topics * 100) if total_topics > 0 else 0
+
+    # 2. Intelligence Score Logic
+    # Formula: (Accuracy * 4) + (Questions / 10) + (Hours / 2)
+    base_score = 300 # Starting score
+    earned_score = (accuracy * 4) + (total_questions / 10) + (study_hours / 2)
+    intelligence_score = min(720, base_score + int(earned_score))
+
+    # 3. Daily Activity (Last 7 Days)
+    days = [
+        {"day": date.strftime("%a"), "hours": round(mins / 60, 1)}
+        for date, mins in daily_minutes
+    ]
+
+    # 4. Subject Mastery
+    subject_mastery = []
+    for sub in SUBJECTS:
+        sub_correct, sub_total = subject_totals.get(sub, (0, 0))
+        sub_acc = (sub_correct / sub_total * 100) if sub_total > 0 else 0
+        subject_mastery.append({
+            "subject": sub,
+            "completion": round(subject_completion(syllabus_data, sub)),
+            "accuracy": round(sub_acc)
+        })
+
+    return {
+        "overallStats": [
+            { "label": 'Questions Solved', "value": str(total_questions), "icon": 'Target', "color": '#4F46E5', "trend": f'+{total_questions} total' },
+            { "label": 'Estimated Accuracy', "value": f'{round(accuracy)}%', "icon": 'Award', "color": '#10B981', "trend": 'Stable' },
+            { "label": 'Study Time', "value": f'{study_hours}h', "icon": 'Clock', "color": '#F59E0B', "trend": f'{total_minutes} mins' },
+            { "label": 'Syllabus Done', "value": f'{round(syllabus_percent)}%', "icon": 'BookOpen', "color": '#EF4444', "trend": f'{completed_topics}/{total_topics}' },
+        ],
+        "subjectMastery": subject_mastery,
+        "dailyActivity": days,
+        "intelligenceScore": {
+            "score": intelligence_score,
+            "improvement": "Growing consistently",
+            "gain": round(earned_score)
+        },
+        "health": {
+            "goalCompletion": round(syllabus_percent),
+            "pyqCoverage": round(accuracy),
+            "notesCount": notes_count,
+            "streak": 0 # Logic for streak can be added later
+        }
+    }
@@ -0,0 +1,74 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import ExpressionWrapper, F, FloatField
+from django.utils import timezone
+
+from .models import SolvedQuestion, User, UserAttempt, UserProgress
+
+
+@transaction.atomic
+def record_answers(user, questions, answers):
+    # `answers` is a list of (question_id, selected_option) and `questions`
+    # maps each answered id to its Question (topic loaded). Returns one
+    # result per answer.
+    attempts = []
+    for question_id, selected_option in answers:
+        question = questions[question_id]
+        attempts.append(UserAttempt(
+            user=user,
+            question=question,
+            selected_option=selected_option,
+            is_correct=(selected_option == question.correct_option),
+        ))
+
+    # A question counts towards progress the first time it is answered
+    # correctly. Locking the user row serialises concurrent submissions from
+    # the same user, so a first solve is never counted twice.
+    User.objects.select_for_update().filter(pk=user.pk).exists()
+    UserAttempt.objects.bulk_create(attempts)
+
+    correct_ids = {a.question_id for a in attempts if a.is_correct}
+    already_solved = set(
+        SolvedQuestion.objects.filter(user=user, question_id__in=correct_ids)
+        .values_list('question_id', flat=True)
+    )
+    newly_solved = correct_ids - already_solved
+    SolvedQuestion.objects.bulk_create(
+        [SolvedQuestion(user=user, question_id=qid) for qid in newly_solved]
+    )
+    solved_per_topic = Counter(questions[qid].topic_id for qid in newly_solved)
+    totals = {questions[qid].topic_id: questions[qid].topic.question_count for qid in newly_solved}
+    _add_solved(user, solved_per_topic, totals)
+
+    return [
+        {
+            "question_id": a.question_id,
+            "is_correct": a.is_correct,
+            "correct_option": a.question.correct_option,
+            "explanation": a.question.explanation,
+        }
+        for a in attempts
+    ]
+
+
+def _add_solved(user, solved_per_topic, totals):
+    # `totals` is the cached Topic.question_count, so no count query is needed
+    if not solved_per_topic:
+        return
+
+    topic_ids = list(solved_per_topic)
+    UserProgress.objects.bulk_create(
+        [UserProgress(user=user, topic_id=topic_id) for topic_id in topic_ids],
+        ignore_conflicts=True,
+    )
+    now = timezone.now()
+    for topic_id, solved in solved_per_topic.items():
+        UserProgress.objects.filter(user=user, topic_id=topic_id).update(
+            questions_solved=F('questions_solved') + solved,
+            percentage=ExpressionWrapper(
+                (F('questions_solved') + solved) * 100.0 / (totals[topic_id] or 1),
+                output_field=FloatField(),
+            ),
+            last_updated=now,
+        )
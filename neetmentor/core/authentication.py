@@ -0,0 +1,94 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import User
+
+# The columns request.user is rebuilt from. Anything else (password,
+# last_login) is deferred and loads on first access. Kept in model field
+# order, which Model.from_db expects.
+SLIM_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields
+    if field.attname in {
+        'id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff',
+        'is_superuser', 'subscription_tier', 'is_email_verified', 'date_joined',
+    }
+)
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def cache():
+    return caches[settings.AUTH_USER_CACHE_ALIAS]
+
+
+def cache_key(user_id):
+    return f"auth-user:{user_id}"
+
+
+def invalidate(user_id):
+    cache().delete(cache_key(user_id))
+
+
+def stats():
+    # Per process. Every hit is a User lookup the database didn't serve.
+    with _stats_lock:
+        hits, misses = _stats['hits'], _stats['misses']
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': hits / total if total else 0.0}
+
+
+def _count(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    # JWTAuthentication with the per-request User lookup served from the
+    # AUTH_USER_CACHE_ALIAS cache (per-process LocMem by default, Redis
+    # with AUTH_CACHE_URL). core.signals invalidates on User save/delete;
+    # the TTL bounds staleness for other processes and queryset.update().
+    # Write requests always read the row, so a stale is_active can't let a
+    # deactivated user write and a stale record is never saved back.
+    fresh = False
+
+    def authenticate(self, request):
+        # DRF builds authenticators per request
+        self.fresh = request.method not in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Needs the password hash, which is never cached
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as exc:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from exc
+
+        key = cache_key(user_id)
+        values = None if self.fresh else cache().get(key)
+        if values is None:
+            _count('misses')
+            values = (
+                User.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+                .values_list(*SLIM_FIELDS).first()
+            )
+            if values is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            cache().set(key, values)
+        else:
+            _count('hits')
+
+        user = User.from_db(DEFAULT_DB_ALIAS, SLIM_FIELDS, values)
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
@@ -0,0 +1,32 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from . import hashing
+
+UserModel = get_user_model()
+
+
+class PooledHashBackend(ModelBackend):
+    # ModelBackend with the password check (and the dummy hash for unknown
+    # users) run in core.hashing's process pool. Raises HashingBusy when the
+    # pool is saturated.
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Same cost as a real check, so unknown users can't be told apart by timing
+            hashing.make_password(password)
+            return
+        valid, needs_rehash = hashing.check_password(password, user.password)
+        if not valid or not self.user_can_authenticate(user):
+            return
+        if needs_rehash:
+            # Hasher or iteration count upgrade; not a password change
+            user.password = hashing.make_password(password)
+            user.save(update_fields=['password'])
+        return user
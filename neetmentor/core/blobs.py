@@ -0,0 +1,315 @@
+import base64
+import binascii
+import hashlib
+import os
+import re
+import logging
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import Blob
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Derived renditions, keyed by name -> longest edge in pixels. The original
+# is always served as uploaded.
+VARIANTS = {'thumb': 256, 'preview': 1024}
+VARIANT_CONTENT_TYPE = 'image/webp'
+
+# Blobs are served publicly (the hash is the capability), so only inert
+# image types are accepted. SVG is excluded because it can carry script.
+ALLOWED_CONTENT_TYPES = {'image/png', 'image/jpeg', 'image/gif', 'image/webp'}
+
+DATA_URL_RE = re.compile(r'^data:(?P<type>[\w.+-]+/[\w.+-]+)?(?:;[\w-]+=[^;,]*)*;base64,', re.I)
+BLOB_URL_RE = re.compile(r'/api/blobs/(?P<sha256>[0-9a-f]{64})/')
+
+# A request for a variant another thread or process is rendering waits this
+# long for it before falling back to the original; a lock file older than
+# LOCK_STALE_SECONDS was left by a crashed renderer and is taken over.
+LOCK_WAIT_SECONDS = 10
+LOCK_STALE_SECONDS = 120
+
+# Pillow's own decompression-bomb guard, as a backstop to the size check in
+# render_variant (it only raises at twice this)
+Image.MAX_IMAGE_PIXELS = settings.BLOB_MAX_PIXELS
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class BlobError(ValueError):
+    pass
+
+
+# Migration 0019 imports decode_data_url, check_content_type,
+# write_blob_file, iter_bytes and BlobError. Keep their signatures and
+# results stable, or that migration behaves differently on a new database.
+
+
+def blob_root():
+    return Path(settings.BLOB_STORE_ROOT)
+
+
+def blob_path(sha256):
+    # Fan out into two directory levels so no directory grows unbounded
+    return blob_root() / sha256[:2] / sha256[2:4] / sha256
+
+
+def check_content_type(content_type):
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    if content_type not in ALLOWED_CONTENT_TYPES:
+        raise BlobError(f"Unsupported content type: {content_type or 'missing'}")
+    return content_type
+
+
+def write_blob_file(chunks):
+    # Streams chunks to a temp file while hashing, then moves it into its
+    # content address. Returns (sha256, size); existing content is reused.
+    root = blob_root()
+    (root / 'tmp').mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=root / 'tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            for chunk in chunks:
+                size += len(chunk)
+                if size > settings.BLOB_MAX_BYTES:
+                    raise BlobError(f"Blob exceeds {settings.BLOB_MAX_BYTES} bytes")
+                digest.update(chunk)
+                tmp.write(chunk)
+        if size == 0:
+            raise BlobError("Empty upload")
+        sha256 = digest.hexdigest()
+        final = blob_path(sha256)
+        if final.exists():
+            os.unlink(tmp_path)
+            os.utime(final)  # fresh again, so purge_orphans leaves it alone
+        else:
+            final.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, final)
+        return sha256, size
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def store(chunks, content_type):
+    content_type = check_content_type(content_type)
+    sha256, size = write_blob_file(chunks)
+    blob, created = Blob.objects.get_or_create(sha256=sha256, defaults={'size': size, 'content_type': content_type})
+    if created:
+        schedule_variants(sha256)
+    return blob
+
+
+def variant_path(sha256, variant):
+    return blob_root() / 'variants' / sha256[:2] / sha256[2:4] / f'{sha256}.{variant}.webp'
+
+
+def orphan_cutoff():
+    return timezone.now() - timedelta(hours=settings.BLOB_ORPHAN_GRACE_HOURS)
+
+
+def remove_files(sha256s):
+    # Unlinks originals and variants, skipping any hash that has a Blob row
+    # again (re-uploaded since it was found unreferenced)
+    sha256s = sorted(set(sha256s))
+    for start in range(0, len(sha256s), 500):
+        batch = sha256s[start:start + 500]
+        alive = set(Blob.objects.filter(sha256__in=batch).values_list('sha256', flat=True))
+        for sha256 in batch:
+            if sha256 in alive:
+                continue
+            blob_path(sha256).unlink(missing_ok=True)
+            for variant in VARIANTS:
+                variant_path(sha256, variant).unlink(missing_ok=True)
+
+
+def stray_files(before):
+    # Files last written before the cutoff: originals with no Blob row (a
+    # note save that rolled back after storing its image) and temp files
+    # left by a killed upload
+    cutoff = before.timestamp()
+    root = blob_root()
+    originals = set()
+    for path in root.glob('[0-9a-f][0-9a-f]/[0-9a-f][0-9a-f]/*'):
+        if path.stat().st_mtime < cutoff:
+            originals.add(path.name)
+    temps = [path for path in root.glob('tmp/*') if path.stat().st_mtime < cutoff]
+    return originals, temps
+
+
+def purge_orphans(before=None):
+    # Deletes blobs created before the cutoff that no note references (a
+    # direct upload never attached, or every note using it deleted), then
+    # their files. The grace period gives a direct upload time to be
+    # attached. Returns the number of Blob rows deleted.
+    before = before or orphan_cutoff()
+    orphans = Blob.objects.filter(created_at__lt=before, notes__isnull=True)
+    sha256s = list(orphans.values_list('sha256', flat=True))
+    deleted = 0
+    for start in range(0, len(sha256s), 500):
+        # Re-checked in the delete, so a note attached meanwhile keeps its blob
+        count, _ = Blob.objects.filter(sha256__in=sha256s[start:start + 500], notes__isnull=True).delete()
+        deleted += count
+    originals, temps = stray_files(before)
+    remove_files(originals | set(sha256s))
+    for path in temps:
+        path.unlink(missing_ok=True)
+    return deleted
+
+
+def render_variant(sha256, variant):
+    # Downscales the original into a WebP rendition. Written through a temp
+    # file so a concurrent reader never sees a partial image.
+    final = variant_path(sha256, variant)
+    final.parent.mkdir(parents=True, exist_ok=True)
+    with Image.open(blob_path(sha256)) as image:
+        # Only the header has been read so far
+        if image.width * image.height > settings.BLOB_MAX_PIXELS:
+            raise BlobError(f"{image.width}x{image.height} exceeds {settings.BLOB_MAX_PIXELS} pixels")
+        image = ImageOps.exif_transpose(image)  # also picks the first frame
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+        image.thumbnail((VARIANTS[variant], VARIANTS[variant]))
+        fd, tmp_path = tempfile.mkstemp(dir=final.parent)
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                image.save(tmp, 'WEBP', quality=80, method=4)
+            os.replace(tmp_path, final)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+    return final
+
+
+def acquire_render_lock(lock):
+    # O_EXCL lock file, so one thread in one process renders a given variant
+    try:
+        os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        pass
+    try:
+        if time.time() - lock.stat().st_mtime > LOCK_STALE_SECONDS:
+            lock.unlink()
+            return acquire_render_lock(lock)
+    except FileNotFoundError:
+        return acquire_render_lock(lock)
+    return False
+
+
+def ensure_variant(sha256, variant):
+    # Variants are a disk cache: anything missing is regenerated on demand.
+    # Returns None if the original cannot be decoded or is still being
+    # rendered elsewhere after LOCK_WAIT_SECONDS.
+    path = variant_path(sha256, variant)
+    if path.exists():
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lock = path.with_name(f'{path.name}.lock')
+    deadline = time.monotonic() + LOCK_WAIT_SECONDS
+    while not acquire_render_lock(lock):
+        if time.monotonic() > deadline:
+            return None
+        time.sleep(0.1)
+        if path.exists():
+            return path
+    try:
+        if path.exists():  # finished between our check and the lock
+            return path
+        return render_variant(sha256, variant)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.warning("Could not render %s variant of blob %s", variant, sha256, exc_info=True)
+        return None
+    finally:
+        lock.unlink(missing_ok=True)
+
+
+def generate_variants(sha256):
+    for variant in VARIANTS:
+        ensure_variant(sha256, variant)
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.BLOB_VARIANT_WORKERS, thread_name_prefix='blob-variants')
+        return _executor
+
+
+def schedule_variants(sha256):
+    # Render off the request path once the Blob row is committed, on a few
+    # shared threads so an upload burst can't start one thread per blob. A
+    # lost job is harmless because ensure_variant fills the gap on first
+    # request.
+    transaction.on_commit(lambda: executor().submit(generate_variants, sha256))
+
+
+def decode_data_url(value):
+    # Returns (content_type, bytes) for a base64 data URL, else None
+    match = DATA_URL_RE.match(value or '')
+    if not match:
+        return None
+    try:
+        data = base64.b64decode(value[match.end():], validate=False)
+    except (binascii.Error, ValueError):
+        raise BlobError("Malformed data URL")
+    return match.group('type'), data
+
+
+def iter_bytes(data):
+    for start in range(0, len(data), CHUNK_SIZE):
+        yield data[start:start + CHUNK_SIZE]
+
+
+def sha256_from_url(value):
+    # Recognises URLs previously handed out for a blob
+    match = BLOB_URL_RE.search(value or '')
+    return match.group('sha256') if match else None
+
+
+def parse_range(header, size):
+    # Single "bytes=" range -> (start, end) inclusive; None to serve the
+    # whole file; raises BlobError if unsatisfiable.
+    match = re.fullmatch(r'\s*bytes=(\d*)-(\d*)\s*', header or '')
+    if not match or (not match.group(1) and not match.group(2)):
+        return None
+    first, last = match.groups()
+    if not first:
+        length = int(last)
+        if length == 0:
+            raise BlobError("Unsatisfiable range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise BlobError("Unsatisfiable range")
+    return start, end
+
+
+def iter_file_range(path, start, end):
+    with open(path, 'rb') as handle:
+        handle.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = handle.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
@@ -0,0 +1,61 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import CatalogueVersion, Question, Topic
+
+
+def adjust_question_count(topic_id, delta):
+    Topic.objects.filter(pk=topic_id).update(question_count=F('question_count') + delta)
+
+
+def actual_question_counts():
+    return Coalesce(
+        Subquery(
+            Question.objects.filter(topic=OuterRef('pk'))
+            .values('topic')
+            .annotate(count=Count('id'))
+            .values('count')
+        ),
+        Value(0),
+    )
+
+
+def refresh_question_counts(topic_ids=None):
+    # Recounts in one UPDATE; used after bulk writes that skip model signals
+    topics = Topic.objects.all()
+    if topic_ids is not None:
+        topics = topics.filter(pk__in=topic_ids)
+    updated = topics.update(question_count=actual_question_counts())
+    bump_generation()
+    return updated
+
+
+def drifted_topics():
+    return Topic.objects.alias(actual=actual_question_counts()).exclude(question_count=F('actual'))
+
+
+def current_generation():
+    return CatalogueVersion.objects.filter(pk=1).values_list('generation', flat=True).first() or 0
+
+
+def bump_generation():
+    # Runs inside the writer's transaction, so readers never pair the new
+    # generation with old rows
+    if not CatalogueVersion.objects.filter(pk=1).update(generation=F('generation') + 1):
+        CatalogueVersion.objects.get_or_create(pk=1, defaults={'generation': 1})
+
+
+def cache():
+    return caches[settings.CATALOGUE_CACHE_ALIAS]
+
+
+# Bump when the serialized shape changes, so shared caches drop old bodies
+CACHE_SHAPE = 2
+
+
+def cache_key(generation, path):
+    return f"catalogue:{CACHE_SHAPE}:{generation}:{hashlib.sha1(path.encode()).hexdigest()}"
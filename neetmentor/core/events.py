@@ -0,0 +1,160 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core import signing
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Salt that makes stream tickets useless as anything else signed with
+# SECRET_KEY, and vice versa
+TICKET_SALT = 'core.events.ticket'
+
+# Per-subscriber buffer. A client that falls this far behind loses events
+# and catches up through the delta endpoints when it reconnects.
+QUEUE_SIZE = 100
+
+
+class LocalBroker:
+    # In-process fan-out. Each subscriber is an asyncio.Queue owned by the
+    # event loop that created it; publish() may be called from any thread
+    # (sync views run in a worker thread under ASGI).
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def publish(self, user_id, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(_offer, queue, message)
+
+    def subscribe(self, user_id):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(QUEUE_SIZE))
+        with self._lock:
+            self._subscribers[user_id].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, user_id, subscriber):
+        with self._lock:
+            self._subscribers[user_id].discard(subscriber)
+            if not self._subscribers[user_id]:
+                del self._subscribers[user_id]
+
+
+class PostgresBroker(LocalBroker):
+    # Shares events between worker processes through LISTEN/NOTIFY on the
+    # application database. Every process runs one listener thread that
+    # feeds notifications (its own included) into the local fan-out.
+    channel = 'neetmentor_events'
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+
+    def publish(self, user_id, message):
+        payload = json.dumps({'user_id': user_id, 'message': message})
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, payload])
+
+    def subscribe(self, user_id):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, daemon=True)
+                self._listener.start()
+        return super().subscribe(user_id)
+
+    def _listen(self):
+        import psycopg2
+
+        db = settings.DATABASES['default']
+        while True:
+            try:
+                conn = psycopg2.connect(
+                    dbname=db['NAME'], user=db['USER'], password=db['PASSWORD'],
+                    host=db['HOST'] or None, port=db['PORT'] or None, **db.get('OPTIONS', {}),
+                )
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN {self.channel}')
+                while True:
+                    if select.select([conn], [], [], 60) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        event = json.loads(conn.notifies.pop(0).payload)
+                        LocalBroker.publish(self, event['user_id'], event['message'])
+            except Exception:
+                logger.exception("Event listener lost its connection; reconnecting")
+                threading.Event().wait(5)
+
+
+def _offer(queue, message):
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        pass
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(settings.EVENTS_BACKEND)()
+        return _broker
+
+
+def publish(user_id, event, data, origin=None):
+    # Delivered after commit so subscribers never see rolled-back changes.
+    # `origin` is the sender's X-Client-Id, letting that tab skip its echo.
+    message = {'event': event, 'data': data, 'origin': origin}
+    transaction.on_commit(lambda: get_broker().publish(user_id, message))
+
+
+def issue_ticket(user_id):
+    # EventSource can't send headers, so the stream URL carries this
+    # instead of the access token: it only opens /events/ and only for
+    # EVENTS_TICKET_SECONDS, so one that ends up in a log is soon worthless
+    return signing.dumps(user_id, salt=TICKET_SALT)
+
+
+def redeem_ticket(ticket):
+    # The ticket's user id, or None if it is forged or expired
+    try:
+        return signing.loads(ticket, salt=TICKET_SALT, max_age=settings.EVENTS_TICKET_SECONDS)
+    except signing.BadSignature:
+        return None
+
+
+def format_event(message):
+    return f"event: {message['event']}\ndata: {json.dumps({'data': message['data'], 'origin': message['origin']})}\n\n"
+
+
+async def listen(user_id, heartbeat, duration):
+    # Yields SSE frames for `user_id` for `duration` seconds, with a comment
+    # line every `heartbeat` seconds to keep proxies from closing an idle
+    # connection.
+    broker = get_broker()
+    loop, queue = subscriber = broker.subscribe(user_id)
+    deadline = loop.time() + duration
+    try:
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=min(heartbeat, remaining))
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            yield format_event(message)
+    finally:
+        broker.unsubscribe(user_id, subscriber)
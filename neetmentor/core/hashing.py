@@ -0,0 +1,106 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+# PBKDF2 runs in a small per-process pool so signup/login spikes queue for
+# a fixed number of cores instead of tying up every request thread. At most
+# PASSWORD_HASH_QUEUE hashes may be in flight per web process; beyond that
+# callers get HashingBusy (503) straight away.
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = None
+
+
+class HashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The server is busy, please try again in a moment.'
+    default_code = 'hashing_busy'
+    wait = 2  # DRF's exception handler turns this into Retry-After
+
+
+def _init_worker():
+    # Spawned children start from a fresh interpreter
+    import django
+    django.setup()
+
+
+def _make_password(password):
+    return hashers.make_password(password)
+
+
+def _check_password(password, encoded):
+    # (valid, needs rehash); the rehash itself happens in the caller
+    # (the same rule as django.contrib.auth.hashers.verify_password)
+    valid = hashers.check_password(password, encoded)
+    if not valid:
+        return False, False
+    preferred = hashers.get_hasher('default')
+    return True, hashers.identify_hasher(encoded).algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+
+def pool():
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the web process is multi-threaded
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+            )
+        if _slots is None:
+            # Outlives pool restarts: in-flight callers release into it
+            _slots = threading.BoundedSemaphore(settings.PASSWORD_HASH_QUEUE)
+        return _pool
+
+
+def _discard(executor):
+    # A worker died (OOM kill, failed start) and the executor is unusable;
+    # the next pool() call starts a fresh one
+    global _pool
+    with _pool_lock:
+        if _pool is executor:
+            _pool = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def run(fn, *args):
+    if not settings.PASSWORD_HASH_WORKERS:
+        return fn(*args)
+    executor = pool()
+    if not _slots.acquire(blocking=False):
+        raise HashingBusy()
+    try:
+        try:
+            return executor.submit(fn, *args).result()
+        except BrokenProcessPool:
+            _discard(executor)
+        executor = pool()
+        try:
+            return executor.submit(fn, *args).result()
+        except BrokenProcessPool:
+            # Broken twice in a row: don't fail the login over it
+            _discard(executor)
+            logger.warning('Password hashing pool failed twice; hashing inline')
+            return fn(*args)
+    finally:
+        _slots.release()
+
+
+def make_password(password):
+    return run(_make_password, password)
+
+
+def check_password(password, encoded):
+    # Returns (valid, needs rehash)
+    return run(_check_password, password, encoded)
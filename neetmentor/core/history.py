@@ -0,0 +1,122 @@
+import base64
+import json
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.db.models import CharField, DateTimeField, F, Q, Value
+from django.db.models.functions import Cast
+from django.utils.dateparse import parse_datetime
+
+from .models import MockTestResult, QuizAttempt, StudyLog, StudyTask, UserNote
+from .serializers import (
+    MockTestResultSerializer, QuizAttemptSerializer, StudyLogSerializer,
+    StudyTaskSerializer, UserNoteSerializer,
+)
+
+# type -> (model, timestamp field, serializer)
+# Date-only rows (DateField) are placed at midnight UTC of their date.
+FEED_SOURCES = {
+    'study_log': (StudyLog, 'date', StudyLogSerializer),
+    'task': (StudyTask, 'created_at', StudyTaskSerializer),
+    'note': (UserNote, 'created_at', UserNoteSerializer),
+    'mock_test': (MockTestResult, 'date', MockTestResultSerializer),
+    'quiz': (QuizAttempt, 'created_at', QuizAttemptSerializer),
+}
+
+
+def _is_date(model, field):
+    return not isinstance(model._meta.get_field(field), DateTimeField)
+
+
+def _ts_q(model, field, lookup, moment):
+    # `<field> <lookup> moment` for the feed timestamp. Date fields are
+    # compared as dates rather than through a cast, which keeps them on the
+    # index and avoids backend-specific cast formatting.
+    if not _is_date(model, field):
+        return Q(**{f'{field}__{lookup}': moment})
+    day = moment.astimezone(dt_timezone.utc).date()
+    at_midnight = moment == datetime.combine(day, time.min, dt_timezone.utc)
+    if lookup == 'lt':
+        return Q(**{f'{field}__lt' if at_midnight else f'{field}__lte': day})
+    if lookup == 'lte':
+        return Q(**{f'{field}__lte': day})
+    if lookup == 'gte':
+        return Q(**{f'{field}__gte' if at_midnight else f'{field}__gt': day})
+    if lookup == 'exact':
+        return Q(**{field: day}) if at_midnight else Q(pk__in=[])
+    raise ValueError(lookup)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(item):
+    raw = json.dumps([item['ts'].isoformat(), item['kind'], item['id']])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        ts, kind, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        ts = parse_datetime(ts)
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    if ts is None or kind not in FEED_SOURCES or not isinstance(pk, int):
+        raise InvalidCursor(cursor)
+    return ts, kind, pk
+
+
+def _after(kind, position):
+    # Keyset condition for "comes after `position`" in (-ts, -kind, -id)
+    # order. `kind` is constant within one source, so the tie-break on it
+    # collapses to a comparison done here in Python.
+    model, field, _ = FEED_SOURCES[kind]
+    ts, cursor_kind, pk = position
+    if kind < cursor_kind:
+        return _ts_q(model, field, 'lte', ts)
+    if kind > cursor_kind:
+        return _ts_q(model, field, 'lt', ts)
+    return _ts_q(model, field, 'lt', ts) | (_ts_q(model, field, 'exact', ts) & Q(id__lt=pk))
+
+
+def feed_page(user, types=None, since=None, until=None, cursor=None, limit=50):
+    # Returns (items, next_cursor). Items are (type, timestamp, serialized
+    # row) tuples, newest first, selected by a single UNION query.
+    types = types or list(FEED_SOURCES)
+    position = decode_cursor(cursor) if cursor else None
+
+    parts = []
+    for kind in types:
+        model, field, _ = FEED_SOURCES[kind]
+        ts = Cast(field, DateTimeField()) if _is_date(model, field) else F(field)
+        qs = model.objects.filter(user=user).annotate(
+            ts=ts, kind=Value(kind, output_field=CharField()),
+        )
+        if since is not None:
+            qs = qs.filter(_ts_q(model, field, 'gte', since))
+        if until is not None:
+            qs = qs.filter(_ts_q(model, field, 'lt', until))
+        if position is not None:
+            qs = qs.filter(_after(kind, position))
+        parts.append(qs.values('id', 'ts', 'kind').order_by())
+
+    combined = parts[0].union(*parts[1:], all=True) if len(parts) > 1 else parts[0]
+    rows = list(combined.order_by('-ts', '-kind', '-id')[:limit + 1])
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    rows = rows[:limit]
+
+    # Hydrate each type with one query and its regular serializer
+    ids_by_kind = {}
+    for row in rows:
+        ids_by_kind.setdefault(row['kind'], []).append(row['id'])
+    serialized = {}
+    for kind, ids in ids_by_kind.items():
+        model, _, serializer_class = FEED_SOURCES[kind]
+        objects = model.objects.filter(user=user).in_bulk(ids)
+        serialized[kind] = {pk: serializer_class(obj).data for pk, obj in objects.items()}
+
+    items = [
+        (row['kind'], row['ts'], serialized[row['kind']][row['id']])
+        for row in rows if row['id'] in serialized[row['kind']]
+    ]
+    return items, next_cursor
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from core.analytics import compute_states, rebuild_rollup, rollup_state
+from core.models import AnalyticsRollup, User
+
+
+class Command(BaseCommand):
+    help = 'Rebuild (default) or verify the per-user AnalyticsRollup rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help='Report drifted rollups without writing')
+        parser.add_argument('--user', action='append', dest='usernames', help='Limit to these usernames')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('pk')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        user_ids = list(users.values_list('pk', flat=True))
+
+        batch_size = options['batch_size']
+        written = drifted = 0
+        for start in range(0, len(user_ids), batch_size):
+            chunk = user_ids[start:start + batch_size]
+            states = compute_states(chunk)
+            existing = {r.user_id: r for r in AnalyticsRollup.objects.filter(user_id__in=chunk)}
+
+            # Drift is found from an unlocked batch read; each drifted user is
+            # then recomputed under the rollup row lock so a concurrent
+            # record_* increment isn't overwritten
+            for user_id, state in states.items():
+                rollup = existing.get(user_id)
+                if rollup is not None and rollup_state(rollup) == state:
+                    continue
+                drifted += 1
+                if options['verify']:
+                    self.stdout.write(f"user {user_id}: {'missing' if rollup is None else 'drifted'}")
+                else:
+                    rebuild_rollup(User(pk=user_id))
+                    written += 1
+
+        if options['verify']:
+            self.stdout.write(f"{len(user_ids)} users checked, {drifted} rollups missing or drifted")
+        else:
+            self.stdout.write(f"{len(user_ids)} users checked, {written} rollups rebuilt")
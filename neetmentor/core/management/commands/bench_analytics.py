@@ -0,0 +1,83 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import QuizAttempt, StudyLog, User
+from core.views import AnalyticsView
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark /api/analytics-data/ for a synthetic user (all rows are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=10000)
+        parser.add_argument('--logs', type=int, default=10000)
+        parser.add_argument('--runs', type=int, default=50)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        user = User.objects.create(username='bench-analytics@example.com')
+        subjects = ['Physics', 'Chemistry', 'Biology']
+        today = date.today()
+
+        QuizAttempt.objects.bulk_create([
+            QuizAttempt(
+                user=user,
+                quiz_name=f'{random.choice(subjects)} Quiz',
+                category='Topic Practice',
+                score=random.randint(0, 180),
+                total_questions=45,
+                correct_answers=random.randint(0, 45),
+                incorrect_answers=0,
+                time_taken=600,
+            )
+            for _ in range(options['attempts'])
+        ], batch_size=1000)
+        StudyLog.objects.bulk_create([
+            StudyLog(
+                user=user,
+                date=today - timedelta(days=random.randint(0, 365)),
+                minutes=random.randint(10, 120),
+                subject=random.choice(subjects),
+            )
+            for _ in range(options['logs'])
+        ], batch_size=1000)
+
+        factory = APIRequestFactory()
+        view = AnalyticsView.as_view()
+        timings = []
+        queries = 0
+        for _ in range(options['runs']):
+            request = factory.get('/api/analytics-data/')
+            force_authenticate(request, user=user)
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                response = view(request)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries = len(ctx.captured_queries)
+            assert response.status_code == 200, response.status_code
+
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f"attempts={options['attempts']} logs={options['logs']} runs={options['runs']}\n"
+            f"queries/request={queries}\n"
+            f"median={statistics.median(timings):.2f}ms p95={p95:.2f}ms"
+        )
@@ -0,0 +1,80 @@
+import os
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from core import hashing
+from core.models import User
+
+PASSWORD = 'bench-login-password'
+
+
+class Command(BaseCommand):
+    help = 'Measure /api/token/ logins per second (and per hashing core) with inline vs pooled password hashing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent clients')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each run')
+
+    def handle(self, *args, **options):
+        # Committed (not rolled back) so the client threads' connections see
+        # them; removed again at the end
+        encoded = make_password(PASSWORD)
+        users = User.objects.bulk_create(
+            User(username=f'bench-login-{i}@example.com', email=f'bench-login-{i}@example.com', password=encoded)
+            for i in range(options['users'])
+        )
+        try:
+            cpus = os.cpu_count() or 1
+            self.stdout.write(f"{options['threads']} clients, {options['seconds']:.0f}s per run, {cpus} CPUs")
+            with override_settings(PASSWORD_HASH_WORKERS=0):
+                self.run('inline hashing', users, options, cores=min(cpus, options['threads']))
+            workers = settings.PASSWORD_HASH_WORKERS
+            hashing.make_password(PASSWORD)  # start the pool outside the timed run
+            self.run(f'pool ({workers} processes, queue {settings.PASSWORD_HASH_QUEUE})', users, options,
+                     cores=min(cpus, workers))
+        finally:
+            User.objects.filter(username__startswith='bench-login-').delete()
+
+    def run(self, label, users, options, cores):
+        latencies, busy = [], []
+        deadline = time.perf_counter() + options['seconds']
+
+        def client(index):
+            api = APIClient()
+            username = users[index % len(users)].username
+            try:
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    response = api.post('/api/token/', {'username': username, 'password': PASSWORD}, format='json')
+                    if response.status_code == 200:
+                        latencies.append(time.perf_counter() - start)
+                    elif response.status_code == 503:
+                        busy.append(1)
+                    else:
+                        raise RuntimeError(f"login failed: {response.status_code} {response.content[:200]}")
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        rate = len(latencies) / elapsed
+        median = statistics.median(latencies) * 1000 if latencies else 0
+        self.stdout.write(
+            f"{label}: {rate:.1f} logins/s ({rate / max(cores, 1):.1f}/s per core), "
+            f"median {median:.0f}ms, {len(busy)} answered 503"
+        )
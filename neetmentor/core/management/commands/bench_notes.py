@@ -0,0 +1,72 @@
+import json
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import User, UserNote, note_preview
+from core.views import UserNoteViewSet
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare the full notes list against ?view=summary: time, peak memory and payload size (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--notes', type=int, default=300)
+        parser.add_argument('--content-kb', type=int, default=4)
+        parser.add_argument('--runs', type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        user = User.objects.create(username='bench-notes@example.com')
+        sentence = 'Key formula and the exception NEET likes to ask about. '
+        body = (sentence * (options['content_kb'] * 1024 // len(sentence) + 1))[:options['content_kb'] * 1024]
+        UserNote.objects.bulk_create([
+            UserNote(user=user, title=f'Note {i}', subject='Physics', content=body, preview=note_preview(body),
+                     image_url='https://example.com/diagram.png' if i % 4 == 0 else None)
+            for i in range(options['notes'])
+        ])
+
+        factory = APIRequestFactory()
+        view = UserNoteViewSet.as_view({'get': 'list'})
+
+        def call(params):
+            request = factory.get('/api/notes/', params)
+            force_authenticate(request, user=user)
+            response = view(request)
+            response.render()
+            assert response.status_code == 200, response.status_code
+            assert len(json.loads(response.content)) == options['notes']
+            return response
+
+        self.stdout.write(f"notes={options['notes']}, content={options['content_kb']} KB each, runs={options['runs']}")
+        for label, params in (('full list', {}), ('summary list', {'view': 'summary'})):
+            call(params)  # warm up
+            timings = []
+            for _ in range(options['runs']):
+                start = time.perf_counter()
+                response = call(params)
+                timings.append((time.perf_counter() - start) * 1000)
+            # Measured separately, as tracing allocations slows the calls down
+            tracemalloc.start()
+            call(params)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.stdout.write(
+                f"{label}: median {statistics.median(timings):.2f}ms, "
+                f"peak {peak / 1024:.0f} KB allocated, {len(response.content) / 1024:.0f} KB response"
+            )
@@ -0,0 +1,72 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Question, Subject, Topic, User, UserAttempt
+from core.quiz import generate_quiz, question_filter
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Time /api/quiz/generate/ sampling on a synthetic question bank against ORDER BY RANDOM() (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=100_000)
+        parser.add_argument('--count', type=int, default=50)
+        parser.add_argument('--runs', type=int, default=30)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        subjects = [Subject.objects.create(name=f'Bench {name}') for name in ('Physics', 'Chemistry', 'Biology')]
+        topics = [Topic.objects.create(subject=subject, name=f'Topic {i}') for subject in subjects for i in range(30)]
+        Question.objects.bulk_create(
+            (
+                Question(topic=random.choice(topics), content=f'Question {i}', options=['a', 'b', 'c', 'd'],
+                         correct_option=0, difficulty=random.choice(('Easy', 'Medium', 'Hard')))
+                for i in range(options['questions'])
+            ),
+            batch_size=2000,
+        )
+
+        user = User.objects.create(username='bench-quiz@example.com')
+        wrong = random.sample(list(Question.objects.filter(topic__in=topics).values_list('id', flat=True)), 300)
+        UserAttempt.objects.bulk_create(
+            UserAttempt(user=user, question_id=qid, selected_option=1, is_correct=False) for qid in wrong
+        )
+
+        cases = {
+            'whole bank': question_filter(topic_ids=[topic.id for topic in topics]),
+            'one subject': question_filter(subject=str(subjects[0].id)),
+            'one topic, Hard': question_filter(topic_ids=[topics[0].id], difficulty='Hard'),
+        }
+        self.stdout.write(f"{options['questions']} questions, count={options['count']}, runs={options['runs']}")
+        for label, condition in cases.items():
+            self.report(label, lambda: generate_quiz(user, options['count'], condition, mistake_share=0.3), options['runs'])
+        self.report(
+            'ORDER BY RANDOM(), whole bank',
+            lambda: list(Question.objects.filter(topic__in=topics).order_by('?')[:options['count']]),
+            max(3, options['runs'] // 10),
+        )
+
+    def report(self, label, generate, runs):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            generate()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(f"{label}: median {statistics.median(timings):.1f}ms, p95 {p95:.1f}ms")
@@ -0,0 +1,83 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import User
+from core.views import UserStorageView
+
+
+class Rollback(Exception):
+    pass
+
+
+def written_bytes(queries):
+    # Size of the INSERT/UPDATE statements as sent, parameters included
+    return sum(
+        len(q['sql']) for q in queries
+        if q['sql'].lstrip().upper().startswith(('INSERT', 'UPDATE'))
+    )
+
+
+class Command(BaseCommand):
+    help = 'Compare write amplification of full-document POST vs keyed PATCH on /api/user-storage/ (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-kb', type=int, default=500)
+        parser.add_argument('--runs', type=int, default=50)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        user = User.objects.create(username='bench-storage@example.com')
+
+        # Syllabus-shaped filler until the document reaches the target size
+        document = {'theme': 'dark', 'syllabus': {}, 'progress': {'tasks': []}}
+        topic = 0
+        while len(json.dumps(document)) < options['size_kb'] * 1024:
+            document['syllabus'].setdefault(f'Subject {topic % 3}', {})[f'Topic {topic}'] = 'completed'
+            document['progress']['tasks'].append({'id': topic, 'title': f'Revise topic {topic}', 'done': False})
+            topic += 1
+        doc_bytes = len(json.dumps(document))
+
+        factory = APIRequestFactory()
+        view = UserStorageView.as_view()
+
+        def call(method, payload):
+            request = getattr(factory, method)('/api/user-storage/', payload, format='json')
+            force_authenticate(request, user=user)
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                response = view(request)
+                elapsed = (time.perf_counter() - start) * 1000
+            assert response.status_code == 200, response.status_code
+            return elapsed, written_bytes(ctx.captured_queries)
+
+        call('post', document)
+
+        results = {}
+        for label, method, payload in (
+            ('full document POST', 'post', document),
+            ('timer_state PATCH', 'patch', None),
+        ):
+            timings, sizes = [], []
+            for i in range(options['runs']):
+                body = payload or {'timer_state': {'seconds': 1500 - i, 'isActive': True, 'mode': 'Pomodoro'}}
+                elapsed, size = call(method, body)
+                timings.append(elapsed)
+                sizes.append(size)
+            results[label] = (statistics.median(timings), int(statistics.median(sizes)))
+
+        self.stdout.write(f"document size: {doc_bytes / 1024:.0f} KB, runs={options['runs']}")
+        for label, (median_ms, median_bytes) in results.items():
+            self.stdout.write(f"{label}: median {median_ms:.2f}ms, {median_bytes} bytes written")
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from core.snapshots import build_snapshots, snapshot_root
+
+
+class Command(BaseCommand):
+    help = 'Write gzipped, pre-serialized question sets (per topic and per subject) and their manifest'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-old', action='store_true',
+                            help='Keep files no longer in the manifest (for clients still holding old URLs)')
+
+    def handle(self, *args, **options):
+        manifest = build_snapshots(prune=not options['keep_old'])
+        sets = manifest['sets'].values()
+        raw = sum(entry['raw_size'] for entry in sets)
+        stored = sum(entry['size'] for entry in sets)
+        self.stdout.write(
+            f"{len(manifest['sets'])} sets, {sum(entry['count'] for entry in sets)} questions "
+            f"at generation {manifest['generation']}: {raw / 1024:.0f} KB JSON, "
+            f"{stored / 1024:.0f} KB gzipped in {snapshot_root()}"
+        )
@@ -0,0 +1,215 @@
+import csv
+import json
+import sys
+import time
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.catalogue import refresh_question_counts
+from core.models import Question, Subject, Topic, question_content_hash
+
+# Fields an import may change on a question it already has; content and
+# options are its identity (content_hash) and sample_key stays put
+UPDATE_FIELDS = ('topic', 'correct_option', 'difficulty', 'explanation')
+
+
+class InvalidRow(Exception):
+    pass
+
+
+def read_jsonl(handle):
+    for line_number, line in enumerate(handle, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield line_number, InvalidRow(f"invalid JSON: {exc}")
+
+
+def read_csv(handle):
+    # `options` is a JSON array or a "|"-separated list
+    reader = csv.DictReader(handle)
+    for row in reader:
+        options = (row.get('options') or '').strip()
+        if options.startswith('['):
+            try:
+                row['options'] = json.loads(options)
+            except json.JSONDecodeError as exc:
+                yield reader.line_num, InvalidRow(f"invalid options: {exc}")
+                continue
+        else:
+            row['options'] = [option.strip() for option in options.split('|')] if options else []
+        yield reader.line_num, row
+
+
+class Command(BaseCommand):
+    help = 'Stream questions from a JSONL or CSV file and upsert them in batches, keyed on content_hash'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="JSONL or CSV file, or - for stdin")
+        parser.add_argument('--format', choices=('jsonl', 'csv'), help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--create-topics', action='store_true',
+                            help='Create subjects and topics that do not exist yet instead of rejecting the row')
+        parser.add_argument('--dry-run', action='store_true', help='Validate every row without writing')
+        parser.add_argument('--max-errors', type=int, default=20, help='Invalid rows to print before going quiet')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+        self.create_topics = options['create_topics']
+        self.topics = {
+            (subject.lower(), name.lower()): pk
+            for pk, subject, name in Topic.objects.values_list('pk', 'subject__name', 'name')
+        }
+        self.topic_ids = set(self.topics.values())
+        # Topics to create, keyed by the negative placeholder id their rows
+        # carry until the batch that first uses them is written
+        self.new_topics = {}
+        # Every hash read so far, so a repeat in a later batch counts as a
+        # duplicate rather than an update of the row this run created
+        self.seen_hashes = set()
+        self.stats = dict.fromkeys(('read', 'created', 'updated', 'duplicate', 'invalid'), 0)
+        touched_topics = set()
+
+        handle = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        start = time.perf_counter()
+        try:
+            rows = self.validated(read_csv(handle) if fmt == 'csv' else read_jsonl(handle), options['max_errors'])
+            while batch := list(islice(rows, options['batch_size'])):
+                by_hash, repeated = self.dedupe(batch)
+                if not options['dry_run']:
+                    touched_topics |= self.upsert(by_hash, repeated)
+        finally:
+            if handle is not sys.stdin:
+                handle.close()
+
+        if touched_topics:
+            # bulk_create skips the signals that keep counts and the
+            # catalogue generation current
+            refresh_question_counts(touched_topics)
+        elapsed = time.perf_counter() - start
+        stats = self.stats
+        self.stdout.write(
+            f"{stats['read']} rows in {elapsed:.1f}s ({stats['read'] / max(elapsed, 1e-9):.0f} rows/s): "
+            f"{stats['created']} created, {stats['updated']} updated, "
+            f"{stats['duplicate']} duplicates in file, {stats['invalid']} invalid"
+            + (' (dry run)' if options['dry_run'] else '')
+        )
+        if stats['invalid'] and not stats['created'] + stats['updated'] and not options['dry_run']:
+            raise CommandError('No rows imported')
+
+    def validated(self, rows, max_errors):
+        for line_number, row in rows:
+            self.stats['read'] += 1
+            try:
+                if isinstance(row, InvalidRow):
+                    raise row
+                yield self.build(row)
+            except (InvalidRow, ValidationError) as exc:
+                self.stats['invalid'] += 1
+                if self.stats['invalid'] <= max_errors:
+                    message = '; '.join(exc.messages) if isinstance(exc, ValidationError) else str(exc)
+                    self.stderr.write(f"line {line_number}: {message}")
+
+    def build(self, row):
+        # Validates against the Question model; raises InvalidRow/ValidationError
+        if not isinstance(row, dict):
+            raise InvalidRow('expected an object')
+        options = row.get('options')
+        if not isinstance(options, list) or len(options) < 2 or not all(str(option).strip() for option in options):
+            raise InvalidRow('options must be a list of at least two non-empty choices')
+        try:
+            correct_option = int(row.get('correct_option'))
+        except (TypeError, ValueError):
+            raise InvalidRow('correct_option must be an integer')
+        if not 0 <= correct_option < len(options):
+            raise InvalidRow(f"correct_option {correct_option} is out of range for {len(options)} options")
+
+        question = Question(
+            topic_id=self.topic_id(row),
+            content=(row.get('content') or '').strip(),
+            options=[str(option).strip() for option in options],
+            correct_option=correct_option,
+            difficulty=(row.get('difficulty') or 'Medium').strip().capitalize(),
+            explanation=(row.get('explanation') or '').strip() or None,
+        )
+        question.full_clean(exclude=('topic', 'content_hash', 'sample_key'), validate_unique=False)
+        question.content_hash = question_content_hash(question.content, question.options)
+        return question
+
+    def topic_id(self, row):
+        if row.get('topic_id') not in (None, ''):
+            try:
+                topic_id = int(row['topic_id'])
+            except (TypeError, ValueError):
+                raise InvalidRow('topic_id must be an integer')
+            if topic_id not in self.topic_ids:
+                raise InvalidRow(f"unknown topic_id {topic_id}")
+            return topic_id
+
+        subject = (row.get('subject') or '').strip()
+        name = (row.get('topic') or '').strip()
+        if not subject or not name:
+            raise InvalidRow('subject and topic (or topic_id) are required')
+        key = (subject.lower(), name.lower())
+        if key not in self.topics:
+            if not self.create_topics:
+                raise InvalidRow(f"unknown topic {subject} / {name} (use --create-topics)")
+            placeholder = -(len(self.new_topics) + 1)
+            self.new_topics[placeholder] = (key, subject, name)
+            self.topics[key] = placeholder
+        return self.topics[key]
+
+    def create_topics_for(self, questions):
+        # Inside the batch transaction; returns {placeholder: topic id}
+        created = {}
+        for question in questions:
+            placeholder = question.topic_id
+            if placeholder < 0 and placeholder not in created:
+                _, subject, name = self.new_topics[placeholder]
+                subject_obj = Subject.objects.filter(name__iexact=subject).first() or Subject.objects.create(name=subject)
+                created[placeholder] = Topic.objects.create(subject=subject_obj, name=name).pk
+            if placeholder < 0:
+                question.topic_id = created[placeholder]
+        return created
+
+    def dedupe(self, batch):
+        # Returns ({hash: question}, hashes already written by an earlier
+        # batch of this run); the last occurrence of a hash wins
+        by_hash, repeated = {}, set()
+        for question in batch:
+            digest = question.content_hash
+            if digest in self.seen_hashes:
+                self.stats['duplicate'] += 1
+                if digest not in by_hash:
+                    repeated.add(digest)
+            self.seen_hashes.add(digest)
+            by_hash[digest] = question
+        return by_hash, repeated
+
+    def upsert(self, by_hash, repeated):
+        # One transaction per batch; returns the topic ids whose counts may
+        # have changed
+        with transaction.atomic():
+            created_topics = self.create_topics_for(by_hash.values())
+            existing = dict(
+                Question.objects.filter(content_hash__in=list(by_hash)).values_list('content_hash', 'topic_id')
+            )
+            Question.objects.bulk_create(
+                by_hash.values(),
+                update_conflicts=True,
+                unique_fields=('content_hash',),
+                update_fields=UPDATE_FIELDS,
+            )
+        for placeholder, topic_id in created_topics.items():
+            key, _, _ = self.new_topics.pop(placeholder)
+            self.topics[key] = topic_id
+            self.topic_ids.add(topic_id)
+        self.stats['updated'] += len(existing.keys() - repeated)
+        self.stats['created'] += len(by_hash) - len(existing)
+        return set(existing.values()) | {question.topic_id for question in by_hash.values()}
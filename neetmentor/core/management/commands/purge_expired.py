@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core.blobs import purge_orphans
+from core.outbox import purge_finished
+from core.registration import purge_expired_registrations
+from core.sync import purge_tombstones, tombstone_cutoff
+
+
+class Command(BaseCommand):
+    help = 'Delete expired bookkeeping rows (study log tombstones, sent and failed outbox mail, expired pending registrations, unreferenced blobs)'
+
+    def handle(self, *args, **options):
+        cutoff = tombstone_cutoff()
+        deleted = purge_tombstones(cutoff)
+        self.stdout.write(f"study log tombstones: {deleted} purged (older than {cutoff:%Y-%m-%d %H:%M})")
+        self.stdout.write(f"outbox: {purge_finished()} sent or failed messages purged")
+        self.stdout.write(f"pending registrations: {purge_expired_registrations()} expired purged")
+        self.stdout.write(f"blobs: {purge_orphans()} unreferenced purged")
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from core.catalogue import drifted_topics, refresh_question_counts
+
+
+class Command(BaseCommand):
+    help = 'Recount Topic.question_count from the Question table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report drifted topics')
+
+    def handle(self, *args, **options):
+        drifted = list(drifted_topics().values_list('pk', 'name', 'question_count'))
+        for pk, name, cached in drifted:
+            self.stdout.write(f"topic {pk} ({name}): cached {cached}")
+
+        if drifted and not options['dry_run']:
+            refresh_question_counts([pk for pk, _, _ in drifted])
+        self.stdout.write(f"{len(drifted)} topics drifted" + ('' if options['dry_run'] else ', repaired'))
@@ -0,0 +1,30 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.outbox import deliver_batch
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued EmailOutbox mail in batches, with retries and exponential backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--concurrency', type=int, default=4, help='Parallel SMTP sessions / API calls')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep when nothing is due')
+        parser.add_argument('--once', action='store_true', help='Drain what is due now and exit')
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='outbox') as executor:
+            while True:
+                close_old_connections()
+                sent, retrying, failed = deliver_batch(executor, concurrency, options['batch_size'])
+                if sent or retrying or failed:
+                    self.stdout.write(f"outbox: {sent} sent, {retrying} retrying, {failed} failed")
+                elif options['once']:
+                    return
+                else:
+                    time.sleep(options['interval'])
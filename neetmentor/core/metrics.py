@@ -0,0 +1,143 @@
+import bisect
+import contextvars
+import threading
+import time
+from collections import defaultdict
+
+from . import authentication
+
+# In-process request metrics, rendered in the Prometheus text format by
+# config.urls' /metrics. Each worker process keeps its own numbers.
+#
+# Latency and response size are recorded for every request. Query count
+# and DB time only for sampled ones (METRICS_SAMPLE_RATE): a database
+# execute_wrapper on every connection reports to the request's collector
+# through a context variable, which follows the request into the threads
+# that run sync views under ASGI.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+DB_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+_collector = contextvars.ContextVar('metrics_collector', default=None)
+
+
+class QueryCollector:
+    __slots__ = ('count', 'seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+def record_query(execute, sql, params, many, context):
+    # Installed on every connection; free apart from the lookup when the
+    # current request isn't sampled
+    collector = _collector.get()
+    if collector is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        collector.seconds += time.perf_counter() - start
+        collector.count += 1
+
+
+def install(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def start_sampling():
+    collector = QueryCollector()
+    return collector, _collector.set(collector)
+
+
+def stop_sampling(token):
+    _collector.reset(token)
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames, buckets):
+        self.name, self.help, self.labelnames, self.buckets = name, help, labelnames, buckets
+        self.series = defaultdict(lambda: [[0] * (len(buckets) + 1), 0.0])  # labels -> [counts, sum]
+
+    def observe(self, labels, value):
+        counts, _ = series = self.series[labels]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, (counts, total) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                yield f'{self.name}_bucket{{{_labels(self.labelnames, labels, le=bound)}}} {cumulative}'
+            yield f'{self.name}_sum{{{_labels(self.labelnames, labels)}}} {total}'
+            yield f'{self.name}_count{{{_labels(self.labelnames, labels)}}} {cumulative}'
+
+
+class Counter:
+    def __init__(self, name, help, labelnames):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self.series = defaultdict(int)
+
+    def inc(self, labels):
+        self.series[labels] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in sorted(self.series.items()):
+            yield f'{self.name}{{{_labels(self.labelnames, labels)}}} {value}'
+
+
+VIEW = ('view', 'method')
+
+requests_total = Counter('neetmentor_http_requests_total', 'Requests by view, method and status', VIEW + ('status',))
+latency = Histogram('neetmentor_http_request_duration_seconds', 'Time from middleware entry to response', VIEW, LATENCY_BUCKETS)
+response_size = Histogram('neetmentor_http_response_size_bytes', 'Response body size (non-streaming)', VIEW, SIZE_BUCKETS)
+queries = Histogram('neetmentor_db_queries_per_request', 'Queries per sampled request', VIEW, QUERY_BUCKETS)
+db_time = Histogram('neetmentor_db_duration_seconds', 'Time in the database per sampled request', VIEW, DB_TIME_BUCKETS)
+
+_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, **extra):
+    pairs = list(zip(names, values)) + list(extra.items())
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in pairs)
+
+
+def observe(view, method, status, seconds, size=None, collector=None):
+    labels = (view, method)
+    with _lock:
+        requests_total.inc((view, method, status))
+        latency.observe(labels, seconds)
+        if size is not None:
+            response_size.observe(labels, size)
+        if collector is not None:
+            queries.observe(labels, collector.count)
+            db_time.observe(labels, collector.seconds)
+
+
+def render():
+    lines = []
+    with _lock:
+        for metric in (requests_total, latency, response_size, queries, db_time):
+            lines.extend(metric.render())
+    auth = authentication.stats()
+    lines += [
+        '# HELP neetmentor_auth_user_cache_total Authenticated-user cache lookups (hits are DB lookups saved)',
+        '# TYPE neetmentor_auth_user_cache_total counter',
+        f'neetmentor_auth_user_cache_total{{result="hit"}} {auth["hits"]}',
+        f'neetmentor_auth_user_cache_total{{result="miss"}} {auth["misses"]}',
+    ]
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,71 @@
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from . import metrics
+
+# Anything else a client sends as the method shares one label
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+
+class RequestMetricsMiddleware:
+    # Records per-view latency, response size and, for sampled requests,
+    # query count and DB time (see core.metrics). Adds a Server-Timing
+    # header. Works in both sync and async chains, so the async SSE view is
+    # not pushed onto a thread.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        start, collector, token = self.begin()
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                metrics.stop_sampling(token)
+        return self.finish(request, response, start, collector)
+
+    async def __acall__(self, request):
+        start, collector, token = self.begin()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                metrics.stop_sampling(token)
+        return self.finish(request, response, start, collector)
+
+    def begin(self):
+        start = time.perf_counter()
+        if random.random() < settings.METRICS_SAMPLE_RATE:
+            return start, *metrics.start_sampling()
+        return start, None, None
+
+    def finish(self, request, response, start, collector):
+        elapsed = time.perf_counter() - start
+        match = request.resolver_match
+        # Route names and patterns keep label cardinality bounded; 404s
+        # share one label
+        view = (match.view_name or match.route or 'unnamed') if match else 'unmatched'
+        method = request.method if request.method in METHODS else 'OTHER'
+        if response.streaming:
+            size = int(response['Content-Length']) if response.has_header('Content-Length') else None
+        else:
+            size = len(response.content)
+        metrics.observe(view, method, response.status_code, elapsed, size, collector)
+
+        if settings.METRICS_SERVER_TIMING:
+            timing = [f'app;dur={elapsed * 1000:.1f}']
+            if collector is not None:
+                timing.append(f'db;dur={collector.seconds * 1000:.1f};desc="{collector.count} queries"')
+            response['Server-Timing'] = ', '.join(timing)
+        return response
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def split_documents(apps, schema_editor):
+    UserStorage = apps.get_model('core', 'UserStorage')
+    UserStorageEntry = apps.get_model('core', 'UserStorageEntry')
+    batch = []
+    for storage in UserStorage.objects.iterator(chunk_size=500):
+        if not isinstance(storage.data, dict):
+            continue
+        batch.extend(
+            UserStorageEntry(user_id=storage.user_id, key=key, value=value)
+            for key, value in storage.data.items()
+        )
+        if len(batch) >= 1000:
+            UserStorageEntry.objects.bulk_create(batch)
+            batch = []
+    UserStorageEntry.objects.bulk_create(batch)
+
+
+def join_documents(apps, schema_editor):
+    UserStorage = apps.get_model('core', 'UserStorage')
+    UserStorageEntry = apps.get_model('core', 'UserStorageEntry')
+    documents = {}
+    for entry in UserStorageEntry.objects.iterator(chunk_size=1000):
+        documents.setdefault(entry.user_id, {})[entry.key] = entry.value
+    for user_id, data in documents.items():
+        UserStorage.objects.update_or_create(user_id=user_id, defaults={'data': data})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_analyticsrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStorageEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255)),
+                ('value', models.JSONField(null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='storage_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'key')},
+            },
+        ),
+        migrations.RunPython(split_documents, join_documents),
+        migrations.RemoveField(
+            model_name='userstorage',
+            name='data',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_userstorageentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstorage',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
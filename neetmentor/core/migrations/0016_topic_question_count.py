@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:36
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_questions(apps, schema_editor):
+    Topic = apps.get_model('core', 'Topic')
+    Question = apps.get_model('core', 'Question')
+    Topic.objects.update(question_count=Coalesce(
+        Subquery(
+            Question.objects.filter(topic=OuterRef('pk'))
+            .values('topic')
+            .annotate(count=Count('id'))
+            .values('count')
+        ),
+        Value(0),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_userstorage_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topic',
+            name='question_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_questions, migrations.RunPython.noop),
+    ]
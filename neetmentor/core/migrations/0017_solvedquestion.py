@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_topic_question_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SolvedQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('solved_at', models.DateTimeField(auto_now_add=True)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.question')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='solved_questions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'question')},
+            },
+        ),
+        # Backfill from correct attempts, keeping the first-solve time
+        migrations.RunSQL(
+            """
+            INSERT INTO core_solvedquestion (user_id, question_id, solved_at)
+            SELECT user_id, question_id, MIN(timestamp)
+            FROM core_userattempt
+            WHERE is_correct
+            GROUP BY user_id, question_id
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
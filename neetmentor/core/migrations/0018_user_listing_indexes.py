@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_solvedquestion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mocktestresult',
+            index=models.Index(fields=['user', '-date', '-id'], name='mocktest_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='quizattempt_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studylog',
+            index=models.Index(fields=['user', '-date', '-id'], name='studylog_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studytask',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='studytask_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usernote',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='usernote_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:40
+
+import django.db.models.deletion
+from django.db import migrations, models, transaction
+
+from core import blobs
+
+BATCH_SIZE = 100
+
+
+def extract_data_urls(apps, schema_editor):
+    # Moves base64 data URLs out of UserNote.image_url into the blob store,
+    # a batch at a time so large tables don't need one long transaction.
+    Blob = apps.get_model('core', 'Blob')
+    UserNote = apps.get_model('core', 'UserNote')
+    last_pk = 0
+    while True:
+        batch = list(
+            UserNote.objects.filter(pk__gt=last_pk, image_url__startswith='data:')
+            .order_by('pk')
+            .only('pk', 'image_url')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        with transaction.atomic():
+            for note in batch:
+                try:
+                    content_type, data = blobs.decode_data_url(note.image_url)
+                    content_type = blobs.check_content_type(content_type)
+                    sha256, size = blobs.write_blob_file(blobs.iter_bytes(data))
+                except (blobs.BlobError, TypeError):
+                    continue  # Leave unrecognised payloads in place
+                Blob.objects.get_or_create(sha256=sha256, defaults={'size': size, 'content_type': content_type})
+                UserNote.objects.filter(pk=note.pk).update(image_id=sha256, image_url=None)
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0018_user_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('size', models.PositiveBigIntegerField()),
+                ('content_type', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='usernote',
+            name='image',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notes', to='core.blob'),
+        ),
+        migrations.RunPython(extract_data_urls, migrations.RunPython.noop),
+    ]
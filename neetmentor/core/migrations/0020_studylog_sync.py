@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_note_image_blobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudyLogTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('log_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='studylog',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='studylog',
+            index=models.Index(fields=['user', 'updated_at'], name='studylog_user_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='studylogtombstone',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='study_log_tombstones', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='studylogtombstone',
+            index=models.Index(fields=['user', 'deleted_at'], name='studylog_tomb_user_idx'),
+        ),
+    ]
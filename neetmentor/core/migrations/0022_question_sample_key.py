@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:51
+
+import random
+
+import core.models
+from django.db import migrations, models
+
+
+def spread_sample_keys(apps, schema_editor):
+    # AddField gave every existing row the same default value
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('UPDATE core_question SET sample_key = random()')
+        return
+    Question = apps.get_model('core', 'Question')
+    batch = []
+    for question in Question.objects.only('id').iterator(chunk_size=2000):
+        question.sample_key = random.random()
+        batch.append(question)
+        if len(batch) == 2000:
+            Question.objects.bulk_update(batch, ['sample_key'])
+            batch = []
+    Question.objects.bulk_update(batch, ['sample_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_catalogue_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='sample_key',
+            field=models.FloatField(db_index=True, default=core.models.random_sample_key),
+        ),
+        migrations.RunPython(spread_sample_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['topic', 'sample_key'], name='question_topic_sample_idx'),
+        ),
+    ]
@@ -0,0 +1,86 @@
+from django.db import migrations
+
+# Frozen copy of the DDL core.search used when this migration was written,
+# so later changes there can't alter what it creates. core.search repairs
+# the SQLite triggers after table rebuilds (see core.signals).
+
+POSTGRES_INDEXES = {
+    'core_question': ('content', 'explanation'),
+    'core_usernote': ('title', 'content'),
+}
+
+# table -> (indexed columns, unindexed filter column)
+SQLITE_INDEXES = {
+    'core_question': (('content', 'explanation'), 'topic_id'),
+    'core_usernote': (('title', 'content'), 'user_id'),
+}
+
+
+def postgres_statements(table, columns):
+    first, second = columns
+    return [
+        f"""ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce({first}, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce({second}, '')), 'B')
+        ) STORED""",
+        f"CREATE INDEX IF NOT EXISTS {table}_search_idx ON {table} USING GIN (search_vector)",
+    ]
+
+
+def sqlite_triggers(table, columns, filter_column):
+    fts = f'{table}_fts'
+    cols = ', '.join(columns + (filter_column,))
+    new = ', '.join(f'new.{c}' for c in columns + (filter_column,))
+    old = ', '.join(f'old.{c}' for c in columns + (filter_column,))
+    delete = f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old});"
+    insert = f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new});"
+    return {
+        f'{fts}_ai': f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert} END",
+        f'{fts}_ad': f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete} END",
+        f'{fts}_au': f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN {delete} {insert} END",
+    }
+
+
+def create_search_index(apps, schema_editor):
+    conn = schema_editor.connection
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            for table, columns in POSTGRES_INDEXES.items():
+                for statement in postgres_statements(table, columns):
+                    cursor.execute(statement)
+        elif conn.vendor == 'sqlite':
+            for table, (columns, filter_column) in SQLITE_INDEXES.items():
+                fts = f'{table}_fts'
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({', '.join(columns)}, "
+                    f"{filter_column} UNINDEXED, content='{table}', content_rowid='id', "
+                    f"tokenize='porter unicode61')"
+                )
+                for statement in sqlite_triggers(table, columns, filter_column).values():
+                    cursor.execute(statement)
+                cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def drop_search_index(apps, schema_editor):
+    conn = schema_editor.connection
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            for table in POSTGRES_INDEXES:
+                cursor.execute(f"DROP INDEX IF EXISTS {table}_search_idx")
+                cursor.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
+        elif conn.vendor == 'sqlite':
+            for table, (columns, filter_column) in SQLITE_INDEXES.items():
+                for name in sqlite_triggers(table, columns, filter_column):
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+                cursor.execute(f"DROP TABLE IF EXISTS {table}_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_question_sample_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:55
+
+import core.models
+from django.db import migrations, models
+
+
+def backfill_content_hash(apps, schema_editor):
+    # Exact duplicates already in the bank keep a NULL hash so the unique
+    # constraint can be added; the oldest copy becomes the import target
+    Question = apps.get_model('core', 'Question')
+    seen = set()
+    batch = []
+    for question in Question.objects.only('id', 'content', 'options').order_by('id').iterator(chunk_size=2000):
+        digest = core.models.question_content_hash(question.content, question.options)
+        if digest in seen:
+            continue
+        seen.add(digest)
+        question.content_hash = digest
+        batch.append(question)
+        if len(batch) == 2000:
+            Question.objects.bulk_update(batch, ['content_hash'])
+            batch = []
+    Question.objects.bulk_update(batch, ['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='content_hash',
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(backfill_content_hash, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='question',
+            name='content_hash',
+            field=models.CharField(editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:02
+
+from datetime import timedelta
+
+import core.models
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def expire_from_created_at(apps, schema_editor):
+    # Existing rows got "now + TTL" from the default; date them from signup
+    PreRegistration = apps.get_model('core', 'PreRegistration')
+    PreRegistration.objects.update(
+        expires_at=F('created_at') + timedelta(minutes=settings.PREREGISTRATION_TTL_MINUTES)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_email_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='preregistration',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True, default=core.models.preregistration_expiry),
+        ),
+        migrations.RunPython(expire_from_created_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='preregistration',
+            index=models.Index(fields=['email', 'otp_code'], name='prereg_email_otp_idx'),
+        ),
+    ]
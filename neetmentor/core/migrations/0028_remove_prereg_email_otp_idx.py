@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # email is unique, so its own index already serves the email + OTP
+    # lookup. IF EXISTS because a development build of 0026 briefly shipped
+    # without the index.
+
+    dependencies = [
+        ('core', '0027_email_outbox_supersede'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'DROP INDEX IF EXISTS prereg_email_otp_idx',
+                    'CREATE INDEX prereg_email_otp_idx ON core_preregistration (email, otp_code)',
+                ),
+            ],
+            state_operations=[
+                migrations.RemoveIndex(
+                    model_name='preregistration',
+                    name='prereg_email_otp_idx',
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:20
+
+from django.db import migrations, models
+
+DIFFICULTIES = ('Easy', 'Medium', 'Hard')
+
+
+def capitalise_difficulty(apps, schema_editor):
+    # core.quiz now filters difficulty by equality; rows saved before
+    # Question.save normalised it may differ in case
+    Question = apps.get_model('core', 'Question')
+    for value in DIFFICULTIES:
+        Question.objects.filter(difficulty__iexact=value).exclude(difficulty=value).update(difficulty=value)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_remove_prereg_email_otp_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(capitalise_difficulty, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['topic', 'difficulty', 'sample_key'], name='question_topic_diff_sample_idx'),
+        ),
+    ]
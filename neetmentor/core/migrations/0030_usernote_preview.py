@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:40
+
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+from django.db.models.functions import Concat, Length, Substr
+from django.db.models.lookups import GreaterThan
+
+PREVIEW_LENGTH = 100
+
+
+def fill_preview(apps, schema_editor):
+    # Same result as core.models.note_preview, in one UPDATE
+    UserNote = apps.get_model('core', 'UserNote')
+    UserNote.objects.update(preview=Case(
+        When(
+            GreaterThan(Length('content'), PREVIEW_LENGTH),
+            then=Concat(Substr('content', 1, PREVIEW_LENGTH), Value('…')),
+        ),
+        default=Substr('content', 1, PREVIEW_LENGTH),
+        output_field=models.CharField(),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_question_difficulty_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usernote',
+            name='preview',
+            field=models.CharField(blank=True, default='', editable=False, max_length=101),
+        ),
+        migrations.RunPython(fill_preview, migrations.RunPython.noop),
+    ]
@@ -1,28 +1,81 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 import datetime
+import hashlib
+import json
+import random
 
 class User(AbstractUser):
     subscription_tier = models.CharField(max_length=50, default='Pro') 
     is_email_verified = models.BooleanField(default=False)
 
+def preregistration_expiry():
+    return timezone.now() + datetime.timedelta(minutes=settings.PREREGISTRATION_TTL_MINUTES)
+
 class PreRegistration(models.Model):
     email = models.EmailField(unique=True)
     first_name = models.CharField(max_length=100)
     password = models.CharField(max_length=255)
     otp_code = models.CharField(max_length=6, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(default=preregistration_expiry, db_index=True) # Reset on every resend; purged by purge_expired
 
     def __str__(self):
         return self.email
 
+class EmailOutbox(models.Model):
+    # Durable queue of outgoing mail, delivered by the send_outbox worker
+    # (see core.outbox). A row is claimed by pushing next_attempt_at past a
+    # lease, so a crashed worker's rows become due again on their own.
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    to = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    supersede_key = models.CharField(max_length=255, blank=True, db_index=True) # A newer message with the same key replaces this one while pending
+    expires_at = models.DateTimeField(null=True, blank=True) # Not delivered after this (e.g. an OTP that no longer works)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx')]
+
+    def __str__(self):
+        return f"{self.to} - {self.subject} ({self.status})"
+
 class UserStorage(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='storage')
-    data = models.JSONField(default=dict)
+    version = models.PositiveBigIntegerField(default=0) # Bumped on every write, exposed as the ETag
     
     def __str__(self):
         return f"{self.user.username}'s Storage"
 
+class UserStorageEntry(models.Model):
+    # One row per top-level key of the user's storage document, so a PATCH
+    # of e.g. timer_state rewrites only that key's value.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='storage_entries')
+    key = models.CharField(max_length=255)
+    value = models.JSONField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'key')
+
+    def __str__(self):
+        return f"{self.user.username} - {self.key}"
+
 class Subject(models.Model):
     name = models.CharField(max_length=100) # e.g., Physics
     
@@ -32,10 +85,22 @@ class Subject(models.Model):
 class Topic(models.Model):
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='topics')
     name = models.CharField(max_length=200) # e.g., Kinematics
+    question_count = models.IntegerField(default=0) # Maintained by core.signals, repaired by repair_question_counts
     
     def __str__(self):
         return f"{self.subject.name} - {self.name}"
 
+def random_sample_key():
+    return random.random()
+
+def question_content_hash(content, options):
+    # Identity of a question for idempotent imports: whitespace-normalised
+    # text and options, independent of topic, answer and explanation.
+    # Migration 0024 backfills with this; changing the result needs a data
+    # migration that rehashes every row.
+    normalised = [' '.join(str(content).split()), [' '.join(str(option).split()) for option in options]]
+    return hashlib.sha256(json.dumps(normalised, ensure_ascii=False).encode()).hexdigest()
+
 class Question(models.Model):
     DIFFICULTY_CHOICES = [
         ('Easy', 'Easy'),
@@ -49,10 +114,41 @@ class Question(models.Model):
     correct_option = models.IntegerField() # index of correct option
     difficulty = models.CharField(max_length=10, choices=DIFFICULTY_CHOICES, default='Medium')
     explanation = models.TextField(blank=True, null=True)
+    sample_key = models.FloatField(default=random_sample_key, db_index=True) # Uniform in [0, 1), for indexed random sampling (core.quiz)
+    content_hash = models.CharField(max_length=64, unique=True, null=True, editable=False) # question_content_hash(), the import_questions upsert key
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['topic', 'sample_key'], name='question_topic_sample_idx'),
+            models.Index(fields=['topic', 'difficulty', 'sample_key'], name='question_topic_diff_sample_idx'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        # Difficulty is kept capitalised so core.quiz filters it by equality
+        self.difficulty = (self.difficulty or '').strip().capitalize()
+        # No lookup here: a duplicate fails on the unique constraint
+        self.content_hash = question_content_hash(self.content, self.options)
+        super().save(*args, **kwargs)
+    
+    def validate_unique(self, exclude=None):
+        # content_hash isn't on any form, so report duplicates through
+        # full_clean (the admin) rather than as an IntegrityError
+        super().validate_unique(exclude)
+        digest = question_content_hash(self.content, self.options)
+        if Question.objects.filter(content_hash=digest).exclude(pk=self.pk).exists():
+            raise ValidationError({'content': 'A question with this content and options already exists.'})
     
     def __str__(self):
         return f"Q{self.id}: {self.content[:50]}..."
 
+class CatalogueVersion(models.Model):
+    # Single row; `generation` bumps on any Subject/Topic/Question change and
+    # keys the cached catalogue responses (see core.catalogue)
+    generation = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Catalogue generation {self.generation}"
+
 class UserAttempt(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='attempts')
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
@@ -60,6 +156,15 @@ class UserAttempt(models.Model):
     is_correct = models.BooleanField()
     timestamp = models.DateTimeField(auto_now_add=True)
 
+class SolvedQuestion(models.Model):
+    # One row per question a user has answered correctly at least once
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='solved_questions')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    solved_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'question')
+
 class UserProgress(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='progress')
     topic = models.ForeignKey(Topic, on_delete=models.CASCADE)
@@ -76,10 +181,29 @@ class StudyLog(models.Model):
     minutes = models.IntegerField(default=0)
     subject = models.CharField(max_length=100, blank=True, null=True)
     topic = models.CharField(max_length=255, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-date', '-id'], name='studylog_user_date_idx'),
+            models.Index(fields=['user', 'updated_at'], name='studylog_user_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.date} - {self.minutes}m"
 
+class StudyLogTombstone(models.Model):
+    # Records a deleted StudyLog so delta sync can report it (see core.sync)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='study_log_tombstones')
+    log_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'deleted_at'], name='studylog_tomb_user_idx')]
+
+    def __str__(self):
+        return f"{self.user.username} - log {self.log_id} deleted {self.deleted_at}"
+
 class MockTestResult(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='mock_tests')
     name = models.CharField(max_length=255)
@@ -95,20 +219,53 @@ class MockTestResult(models.Model):
     time_phy = models.IntegerField(default=0)
     mistake_breakdown = models.JSONField(default=list) # Store as list of objects
     
+    class Meta:
+        indexes = [models.Index(fields=['user', '-date', '-id'], name='mocktest_user_date_idx')]
+    
     def __str__(self):
         return f"{self.user.username} - {self.name} ({self.score})"
 
+class Blob(models.Model):
+    # Content-addressed file in the blob store (see core.blobs); the bytes
+    # live on disk under BLOB_STORE_ROOT, keyed by their SHA-256.
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    size = models.PositiveBigIntegerField()
+    content_type = models.CharField(max_length=100)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.content_type}, {self.size}B)"
+
+NOTE_PREVIEW_LENGTH = 100
+
+def note_preview(content):
+    # The start of a note for the notes grid, stored so listing never reads
+    # the body. Migration 0030 backfills the same result in SQL.
+    content = content or ''
+    if len(content) > NOTE_PREVIEW_LENGTH:
+        return content[:NOTE_PREVIEW_LENGTH] + '…'
+    return content
+
 class UserNote(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notes')
     title = models.CharField(max_length=255)
     content = models.TextField()
+    preview = models.CharField(max_length=NOTE_PREVIEW_LENGTH + 1, blank=True, default='', editable=False) # note_preview(content)
     subject = models.CharField(max_length=100, default='General')
     chapter = models.CharField(max_length=255, blank=True, null=True)
-    image_url = models.TextField(blank=True, null=True) # Storing as base64 or URL
+    image_url = models.TextField(blank=True, null=True) # External URL; uploaded images live in `image`
+    image = models.ForeignKey(Blob, on_delete=models.SET_NULL, blank=True, null=True, related_name='notes')
     is_pinned = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [models.Index(fields=['user', '-created_at', '-id'], name='usernote_user_created_idx')]
+    
+    def save(self, *args, **kwargs):
+        self.preview = note_preview(self.content)
+        super().save(*args, **kwargs)
+    
     def __str__(self):
         return f"{self.user.username} - {self.title}"
 
@@ -122,6 +279,9 @@ class StudyTask(models.Model):
     is_done = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [models.Index(fields=['user', '-created_at', '-id'], name='studytask_user_created_idx')]
+    
     def __str__(self):
         return f"{self.user.username} - {self.topic}"
 
@@ -137,5 +297,21 @@ class QuizAttempt(models.Model):
     mistake_data = models.JSONField(default=list)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['user', '-created_at', '-id'], name='quizattempt_user_created_idx')]
+
     def __str__(self):
         return f"{self.user.username} - {self.quiz_name} ({self.score})"
+
+class AnalyticsRollup(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='analytics_rollup')
+    total_questions = models.IntegerField(default=0)
+    correct_answers = models.IntegerField(default=0)
+    total_minutes = models.IntegerField(default=0)
+    daily_minutes = models.JSONField(default=dict) # {"YYYY-MM-DD": minutes}
+    subject_stats = models.JSONField(default=dict) # {"Physics": {"correct": n, "total": n}}
+    notes_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username}'s Analytics"
@@ -0,0 +1,133 @@
+import random
+from datetime import timedelta
+
+import resend
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+# Mail is written to EmailOutbox in the request's transaction and delivered
+# by `manage.py send_outbox`, so a slow provider never holds a web worker.
+
+LEASE = timedelta(minutes=5)  # how long a claimed row is hidden from other workers
+MAX_BACKOFF = timedelta(hours=1)
+
+
+def enqueue(to, subject, body, html_body='', supersede_key='', expires_at=None):
+    # A pending message with the same supersede_key is dropped, so a resent
+    # OTP doesn't also deliver the code it replaced. One already claimed by
+    # a worker may still go out.
+    if supersede_key:
+        EmailOutbox.objects.filter(status='pending', supersede_key=supersede_key).delete()
+    return EmailOutbox.objects.create(
+        to=to, subject=subject, body=body, html_body=html_body,
+        supersede_key=supersede_key, expires_at=expires_at,
+    )
+
+
+def backoff(attempts):
+    # Exponential with +-20% jitter so a provider outage doesn't retry in lockstep
+    delay = min(settings.EMAIL_OUTBOX_RETRY_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF.total_seconds())
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim(limit):
+    # Due rows, leased to this worker. skip_locked lets several workers run
+    # on Postgres; SQLite serialises writers anyway.
+    now = timezone.now()
+    with transaction.atomic():
+        EmailOutbox.objects.filter(status='pending', expires_at__lte=now).update(
+            status='failed', last_error='Expired before delivery'
+        )
+        ids = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at').values_list('id', flat=True)[:limit]
+        )
+        EmailOutbox.objects.filter(id__in=ids).update(next_attempt_at=now + LEASE)
+    return list(EmailOutbox.objects.filter(id__in=ids).order_by('id'))
+
+
+def send_chunk(messages):
+    # Runs in a pool thread and never touches the database; one SMTP session
+    # per chunk. Returns [(message, error or None)].
+    results = []
+    try:
+        if settings.RESEND_API_KEY:
+            resend.api_key = settings.RESEND_API_KEY
+            for message in messages:
+                try:
+                    resend.Emails.send({
+                        "from": settings.DEFAULT_FROM_EMAIL,
+                        "to": [message.to],
+                        "subject": message.subject,
+                        "text": message.body,
+                        **({"html": message.html_body} if message.html_body else {}),
+                    })
+                    results.append((message, None))
+                except Exception as exc:
+                    results.append((message, exc))
+            return results
+
+        with get_connection() as connection:
+            for message in messages:
+                email = EmailMultiAlternatives(
+                    message.subject, message.body, settings.DEFAULT_FROM_EMAIL, [message.to], connection=connection
+                )
+                if message.html_body:
+                    email.attach_alternative(message.html_body, 'text/html')
+                try:
+                    email.send()
+                    results.append((message, None))
+                except Exception as exc:
+                    results.append((message, exc))
+    except Exception as exc:
+        # Connecting failed: the whole chunk is retried
+        done = {message.pk for message, _ in results}
+        results += [(message, exc) for message in messages if message.pk not in done]
+    return results
+
+
+def record(results):
+    now = timezone.now()
+    sent, retry, failed = [], [], []
+    for message, error in results:
+        message.attempts += 1
+        if error is None:
+            message.status, message.sent_at, message.last_error = 'sent', now, ''
+            sent.append(message)
+            continue
+        message.last_error = f"{type(error).__name__}: {error}"[:2000]
+        if message.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            message.status = 'failed'
+            failed.append(message)
+        else:
+            message.next_attempt_at = now + backoff(message.attempts)
+            retry.append(message)
+    EmailOutbox.objects.bulk_update(
+        sent + retry + failed, ['status', 'attempts', 'sent_at', 'last_error', 'next_attempt_at']
+    )
+    return len(sent), len(retry), len(failed)
+
+
+def deliver_batch(executor, concurrency, batch_size):
+    # Returns (sent, retrying, failed) for one claimed batch
+    messages = claim(batch_size)
+    if not messages:
+        return 0, 0, 0
+    chunks = [messages[i::concurrency] for i in range(concurrency) if messages[i::concurrency]]
+    results = [result for chunk in executor.map(send_chunk, chunks) for result in chunk]
+    return record(results)
+
+
+def purge_finished(before=None):
+    # Sent and failed rows past the retention period
+    before = before or timezone.now() - timedelta(days=settings.EMAIL_OUTBOX_RETENTION_DAYS)
+    deleted, _ = EmailOutbox.objects.filter(
+        Q(status='sent', sent_at__lt=before) | Q(status='failed', created_at__lt=before)
+    ).delete()
+    return deleted
@@ -0,0 +1,19 @@
+from rest_framework.pagination import CursorPagination
+
+
+class OptInCursorPagination(CursorPagination):
+    # Only paginates when the client sends ?cursor= or ?page_size=, so
+    # callers that expect a plain list keep getting one. Views declare a
+    # `cursor_ordering` that is backed by a (user, ...) index.
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        return tuple(getattr(view, 'cursor_ordering', None) or super().get_ordering(request, queryset, view))
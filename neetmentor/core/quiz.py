@@ -0,0 +1,124 @@
+import random
+
+from django.db import connection
+from django.db.models import Exists, OuterRef, Q, Subquery
+
+from .models import Question, SolvedQuestion, Topic, UserAttempt
+
+# Pools of up to SMALL_POOL questions (at least SMALL_POOL_FACTOR times the
+# request) are read whole from the covering index and sampled in Python;
+# larger ones through random pivots in the sample_key index,
+# PIVOTS_PER_QUERY index seeks per round trip.
+SMALL_POOL = 5000
+SMALL_POOL_FACTOR = 4
+PIVOTS_PER_QUERY = 50
+TOP_UP_ROUNDS = 3
+
+# Never a sample_key (those are in [0, 1)); marks the pivot parameter in
+# the compiled per-pivot query
+PIVOT_MARKER = -1.0
+
+MISTAKE_LOOKBACK = 500  # most recent wrong answers considered
+
+
+def question_filter(subject=None, topic_ids=None, difficulty=None):
+    # Subject is resolved to topic ids up front so sampling can use the
+    # (topic, difficulty, sample_key) and (topic, sample_key) indexes
+    # instead of joining through Topic
+    condition = Q()
+    if subject:
+        topics = Topic.objects.filter(
+            Q(subject_id=int(subject)) if subject.isdigit() else Q(subject__name__iexact=subject)
+        )
+        condition &= Q(topic_id__in=list(topics.values_list('id', flat=True)))
+    if topic_ids:
+        condition &= Q(topic_id__in=topic_ids)
+    if difficulty:
+        # Stored capitalised (Question.save), so this is a plain equality
+        condition &= Q(difficulty=difficulty.strip().capitalize())
+    return condition
+
+
+def _first_after(queryset, pivots):
+    # Ids of the first row at or after each pivot, one index seek per
+    # pivot and one round trip for all of them. Pivots past the last row
+    # find nothing; the caller wraps them to the first row.
+    sql, params = (
+        queryset.filter(sample_key__gte=PIVOT_MARKER).order_by('sample_key')
+        .values_list('id', flat=True)[:1].query.sql_with_params()
+    )
+    slot = params.index(PIVOT_MARKER)
+    union, union_params = [], []
+    for i, pivot in enumerate(pivots):
+        union.append(f'SELECT * FROM ({sql}) AS pivot_{i}')
+        union_params += [*params[:slot], pivot, *params[slot + 1:]]
+    with connection.cursor() as cursor:
+        cursor.execute(' UNION ALL '.join(union), union_params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def sample_ids(queryset, count, exclude=()):
+    # `count` random ids from `queryset` without ORDER BY RANDOM().
+    #
+    # Small pools are read whole and sampled uniformly. Otherwise each id is
+    # the first row at or after a uniform random pivot in the sample_key
+    # index, one row per pivot, so neighbouring rows are never picked
+    # together. What remains is a mild bias: a row's chance is proportional
+    # to the gap in sample_key before it, which averages 1/n but varies
+    # from row to row. Pivots that land on an already picked row are
+    # retried for TOP_UP_ROUNDS rounds.
+    excluded = set(exclude)
+    small = max(SMALL_POOL, (count + len(excluded)) * SMALL_POOL_FACTOR)
+    pool = list(queryset.values_list('id', flat=True)[:small + 1])
+    if len(pool) <= small:
+        pool = [pk for pk in pool if pk not in excluded]
+        return random.sample(pool, min(count, len(pool)))
+
+    picked = dict.fromkeys(excluded)
+    first = None
+    for _ in range(TOP_UP_ROUNDS):
+        need = count - (len(picked) - len(excluded))
+        if need <= 0:
+            break
+        for start in range(0, need, PIVOTS_PER_QUERY):
+            pivots = [random.random() for _ in range(min(PIVOTS_PER_QUERY, need - start))]
+            ids = _first_after(queryset, pivots)
+            if len(ids) < len(pivots):
+                if first is None:
+                    first = queryset.order_by('sample_key').values_list('id', flat=True).first()
+                ids.append(first)
+            picked.update(dict.fromkeys(ids))
+    ids = [pk for pk in picked if pk not in excluded][:count]
+    random.shuffle(ids)
+    return ids
+
+
+def mistake_ids(user):
+    # Questions answered wrongly through submit-answer(s), as a subquery: an
+    # id list combined with a topic list makes SQLite probe every
+    # (topic, id) pair. QuizAttempt mistake_data is not used: its ids are
+    # client-side (mock question numbers, Date.now() for custom quizzes),
+    # not Question keys.
+    return (
+        UserAttempt.objects.filter(user=user, is_correct=False)
+        .order_by('-timestamp').values('question_id')[:MISTAKE_LOOKBACK]
+    )
+
+
+def generate_quiz(user, count, condition=Q(), mistake_share=0.0):
+    # Returns (questions, review_ids). Up to `mistake_share` of the quiz is
+    # drawn from past mistakes the user has not since solved; the rest is a
+    # uniform sample.
+    questions = Question.objects.filter(condition)
+    review = []
+    if mistake_share > 0:
+        solved = SolvedQuestion.objects.filter(user=user, question_id=OuterRef('pk'))
+        candidates = list(
+            questions.filter(id__in=Subquery(mistake_ids(user))).exclude(Exists(solved)).values_list('id', flat=True)
+        )
+        review = random.sample(candidates, min(len(candidates), round(count * mistake_share)))
+
+    ids = review + sample_ids(questions, count - len(review), exclude=review)
+    random.shuffle(ids)
+    by_id = Question.objects.in_bulk(ids)
+    return [by_id[pk] for pk in ids if pk in by_id], set(review)
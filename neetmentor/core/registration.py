@@ -0,0 +1,20 @@
+from django.utils import timezone
+
+from .models import PreRegistration
+
+PURGE_BATCH = 1000
+
+
+def purge_expired_registrations(before=None, batch_size=PURGE_BATCH):
+    # Deletes in short batches so a backlog of bot signups never holds one
+    # long lock on the table
+    before = before or timezone.now()
+    deleted = 0
+    while True:
+        ids = list(
+            PreRegistration.objects.filter(expires_at__lt=before)
+            .order_by('expires_at').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += PreRegistration.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,159 @@
+import re
+
+from django.db import connection
+
+from .models import Question, UserNote
+
+# Ranked full-text search over questions and notes. The indexes are backend
+# specific and live outside the model state:
+#   Postgres: a generated, weighted tsvector column with a GIN index
+#   SQLite:   an external-content FTS5 table kept in step by triggers
+# Both update on every write. Other backends fall back to unranked
+# icontains matching.
+
+POSTGRES_INDEXES = {
+    'core_question': ('content', 'explanation'),
+    'core_usernote': ('title', 'content'),
+}
+
+# table -> (indexed columns, unindexed filter column)
+SQLITE_INDEXES = {
+    'core_question': (('content', 'explanation'), 'topic_id'),
+    'core_usernote': (('title', 'content'), 'user_id'),
+}
+
+
+def _postgres_statements(table, columns):
+    first, second = columns
+    return [
+        f"""ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce({first}, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce({second}, '')), 'B')
+        ) STORED""",
+        f"CREATE INDEX IF NOT EXISTS {table}_search_idx ON {table} USING GIN (search_vector)",
+    ]
+
+
+def _sqlite_triggers(table, columns, filter_column):
+    fts = f'{table}_fts'
+    cols = ', '.join(columns + (filter_column,))
+    new = ', '.join(f'new.{c}' for c in columns + (filter_column,))
+    old = ', '.join(f'old.{c}' for c in columns + (filter_column,))
+    delete = f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old});"
+    insert = f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new});"
+    return {
+        f'{fts}_ai': f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert} END",
+        f'{fts}_ad': f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete} END",
+        f'{fts}_au': f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN {delete} {insert} END",
+    }
+
+
+def ensure_index(conn=connection, repair_only=False):
+    # Idempotent. On SQLite it also restores triggers that a table rebuild
+    # (Django's way of altering columns there) dropped, then reindexes.
+    # `repair_only` leaves databases that never had the index alone.
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql' and not repair_only:
+            for table, columns in POSTGRES_INDEXES.items():
+                for statement in _postgres_statements(table, columns):
+                    cursor.execute(statement)
+        elif conn.vendor == 'sqlite':
+            cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+            existing = {row[0] for row in cursor.fetchall()}
+            for table, (columns, filter_column) in SQLITE_INDEXES.items():
+                fts = f'{table}_fts'
+                triggers = _sqlite_triggers(table, columns, filter_column)
+                if fts in existing and existing.issuperset(triggers):
+                    continue
+                if fts not in existing and repair_only:
+                    continue
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({', '.join(columns)}, "
+                    f"{filter_column} UNINDEXED, content='{table}', content_rowid='id', "
+                    f"tokenize='porter unicode61')"
+                )
+                for statement in triggers.values():
+                    cursor.execute(statement)
+                cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def drop_index(conn=connection):
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            for table in POSTGRES_INDEXES:
+                cursor.execute(f"DROP INDEX IF EXISTS {table}_search_idx")
+                cursor.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
+        elif conn.vendor == 'sqlite':
+            for table, (columns, filter_column) in SQLITE_INDEXES.items():
+                for name in _sqlite_triggers(table, columns, filter_column):
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+                cursor.execute(f"DROP TABLE IF EXISTS {table}_fts")
+
+
+def _fts5_query(text):
+    # Quote every word so user input can't hit FTS5 query syntax; the last
+    # word is a prefix match for search-as-you-type
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"' for word in words[:-1]) + f' "{words[-1]}"*'
+
+
+def _ranked_ids(table, text, filter_column, filter_values, limit):
+    # [(id, rank)] best first, or None when the backend has no index
+    if connection.vendor == 'postgresql':
+        where = f'AND t.{filter_column} = ANY(%s)' if filter_values is not None else ''
+        sql = (
+            f"SELECT t.id, ts_rank_cd(t.search_vector, query) AS rank "
+            f"FROM {table} t, websearch_to_tsquery('english', %s) query "
+            f"WHERE t.search_vector @@ query {where} ORDER BY rank DESC, t.id LIMIT %s"
+        )
+        params = [text] + ([list(filter_values)] if filter_values is not None else []) + [limit]
+    elif connection.vendor == 'sqlite':
+        match = _fts5_query(text)
+        if match is None:
+            return []
+        fts = f'{table}_fts'
+        where = ''
+        if filter_values is not None:
+            where = f"AND {filter_column} IN ({', '.join(['%s'] * len(filter_values))})" if filter_values else 'AND 0'
+        sql = (
+            f"SELECT rowid, -bm25({fts}, 2.0, 1.0) AS rank FROM {fts} "
+            f"WHERE {fts} MATCH %s {where} ORDER BY rank DESC, rowid LIMIT %s"
+        )
+        params = [match] + list(filter_values or []) + [limit]
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _hydrate(queryset, ranked):
+    objects = queryset.in_bulk([pk for pk, _ in ranked])
+    results = []
+    for pk, rank in ranked:
+        if pk in objects:
+            objects[pk].rank = rank
+            results.append(objects[pk])
+    return results
+
+
+def search_questions(text, topic_ids=None, limit=20):
+    ranked = _ranked_ids('core_question', text, 'topic_id', topic_ids, limit)
+    if ranked is None:
+        queryset = Question.objects.filter(content__icontains=text)
+        if topic_ids is not None:
+            queryset = queryset.filter(topic_id__in=topic_ids)
+        ranked = [(pk, 0.0) for pk in queryset.values_list('id', flat=True)[:limit]]
+    return _hydrate(Question.objects.all(), ranked)
+
+
+def search_notes(user, text, queryset=None, limit=20):
+    # `queryset` lets the caller pick the projection (e.g. the summary one)
+    queryset = UserNote.objects.filter(user=user) if queryset is None else queryset
+    ranked = _ranked_ids('core_usernote', text, 'user_id', [user.pk], limit)
+    if ranked is None:
+        matches = queryset.filter(title__icontains=text) | queryset.filter(content__icontains=text)
+        ranked = [(pk, 0.0) for pk in matches.values_list('id', flat=True)[:limit]]
+    return _hydrate(queryset, ranked)
@@ -1,9 +1,19 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import Subject, Topic, Question, UserAttempt, UserProgress, MockTestResult, StudyLog, UserNote, StudyTask, UserStorage, QuizAttempt
+from django.db import transaction
+from django.db.models import BooleanField, Case, ExpressionWrapper, F, Q, Value, When
+from django.urls import reverse
+from . import blobs
+from .models import Subject, Topic, Question, UserAttempt, UserProgress, MockTestResult, StudyLog, UserNote, StudyTask, UserStorage, QuizAttempt, Blob
 
 User = get_user_model()
 
+def blob_url(request, sha256, variant=None):
+    url = reverse('blob-detail', args=[sha256])
+    if variant:
+        url += f'?variant={variant}'
+    return request.build_absolute_uri(url) if request is not None else url
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -37,18 +47,26 @@ class SubjectSerializer(serializers.ModelSerializer):
 class TopicSerializer(serializers.ModelSerializer):
     class Meta:
         model = Topic
-        fields = '__all__'
+        exclude = ('question_count',)
 
 class QuestionSerializer(serializers.ModelSerializer):
+    # sample_key would let clients predict the quiz sampler
     class Meta:
         model = Question
-        fields = '__all__'
+        exclude = ('sample_key', 'content_hash')
 
 class UserAttemptSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserAttempt
         fields = '__all__'
 
+class AnswerSerializer(serializers.Serializer):
+    question_id = serializers.IntegerField()
+    selected_option = serializers.IntegerField()
+
+class BulkAnswerSerializer(serializers.Serializer):
+    answers = AnswerSerializer(many=True, allow_empty=False, max_length=500)
+
 class UserProgressSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserProgress
@@ -68,8 +86,94 @@ class MockTestResultSerializer(serializers.ModelSerializer):
 class UserNoteSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserNote
-        fields = '__all__'
-        extra_kwargs = {'user': {'read_only': True}}
+        exclude = ('preview',)
+        extra_kwargs = {'user': {'read_only': True}, 'image': {'read_only': True}}
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if instance.image_id:
+            # Views can ask for a smaller rendition (the notes list uses "thumb")
+            data['image_url'] = blob_url(
+                self.context.get('request'), instance.image_id, self.context.get('image_variant'),
+            )
+        return data
+
+    def validate(self, attrs):
+        # image_url may carry a base64 data URL (stored in the blob store when
+        # the note is saved), a URL handed out for an existing blob, or an
+        # external URL
+        if 'image_url' not in attrs:
+            return attrs
+        value = attrs['image_url']
+        sha256 = blobs.sha256_from_url(value)
+        if sha256 and Blob.objects.filter(sha256=sha256).exists():
+            attrs['image'], attrs['image_url'] = Blob(sha256=sha256), None
+            return attrs
+        try:
+            decoded = blobs.decode_data_url(value)
+            if decoded is not None:
+                blobs.check_content_type(decoded[0])
+        except blobs.BlobError as e:
+            raise serializers.ValidationError({'image_url': [str(e)]})
+        attrs['image'] = None
+        if decoded is not None:
+            attrs['image_upload'], attrs['image_url'] = decoded, None
+        return attrs
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            self.store_image(validated_data)
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            self.store_image(validated_data)
+            return super().update(instance, validated_data)
+
+    def store_image(self, validated_data):
+        # Written on save rather than in validate, so a rejected request
+        # stores nothing. If the note save then fails the Blob row rolls
+        # back and blobs.purge_orphans removes the file.
+        upload = validated_data.pop('image_upload', None)
+        if upload is None:
+            return
+        content_type, data = upload
+        try:
+            validated_data['image'] = blobs.store(blobs.iter_bytes(data), content_type)
+        except blobs.BlobError as e:
+            raise serializers.ValidationError({'image_url': [str(e)]})
+
+class UserNoteSummarySerializer(serializers.ModelSerializer):
+    # Grid projection of a note. Expects a queryset prepared by
+    # setup_queryset(): content is never read, and image_url only to pass
+    # short external links through.
+    COLUMNS = ('id', 'title', 'preview', 'subject', 'chapter', 'is_pinned', 'created_at', 'updated_at', 'image')
+
+    content_preview = serializers.CharField(source='preview', read_only=True)
+    has_image = serializers.BooleanField(read_only=True)
+    image_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UserNote
+        fields = ('id', 'title', 'subject', 'chapter', 'is_pinned', 'created_at', 'updated_at',
+                  'content_preview', 'has_image', 'image_url')
+
+    @classmethod
+    def setup_queryset(cls, queryset):
+        has_image = Q(image__isnull=False) | (Q(image_url__isnull=False) & ~Q(image_url=''))
+        return queryset.only(*cls.COLUMNS).annotate(
+            has_image=ExpressionWrapper(has_image, output_field=BooleanField()),
+            # Short external links are passed through; inline data URLs are not
+            external_image_url=Case(
+                When(image_url__startswith='data:', then=Value(None)),
+                default=F('image_url'),
+            ),
+        )
+
+    def get_image_url(self, obj):
+        if obj.image_id:
+            return blob_url(self.context.get('request'), obj.image_id, 'thumb')
+        return obj.external_image_url
 
 class StudyTaskSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,81 @@
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+
+from . import authentication, metrics
+from .catalogue import adjust_question_count, bump_generation
+from .models import Question, StudyLog, StudyLogTombstone, Subject, Topic, User
+from .search import ensure_index
+
+
+@receiver(pre_save, sender=Question)
+def remember_question_topic(sender, instance, raw, **kwargs):
+    # Admin edits can move a question to another topic
+    if raw or instance._state.adding:
+        instance._previous_topic_id = None
+        return
+    instance._previous_topic_id = (
+        Question.objects.filter(pk=instance.pk).values_list('topic_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Question)
+def count_saved_question(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    if created:
+        adjust_question_count(instance.topic_id, 1)
+        return
+    previous = getattr(instance, '_previous_topic_id', None)
+    if previous is not None and previous != instance.topic_id:
+        adjust_question_count(previous, -1)
+        adjust_question_count(instance.topic_id, 1)
+
+
+@receiver(post_delete, sender=Question)
+def count_deleted_question(sender, instance, **kwargs):
+    adjust_question_count(instance.topic_id, -1)
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_save, sender=Topic)
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Subject)
+@receiver(post_delete, sender=Topic)
+@receiver(post_delete, sender=Question)
+def bump_catalogue_generation(sender, raw=False, **kwargs):
+    # Invalidates every cached catalogue response
+    if not raw:
+        bump_generation()
+
+
+@receiver(post_delete, sender=StudyLog)
+def tombstone_study_log(sender, instance, origin=None, **kwargs):
+    # Every deletion path (API, admin, bulk deletes) leaves a tombstone for
+    # delta sync, except a cascade from deleting the user, whose tombstones
+    # go with them
+    if isinstance(origin, User) or getattr(origin, 'model', None) is User:
+        return
+    StudyLogTombstone.objects.create(user_id=instance.user_id, log_id=instance.pk)
+
+
+@receiver(post_migrate)
+def repair_search_index(sender, using, **kwargs):
+    # SQLite drops the FTS triggers whenever a migration rebuilds core_question
+    # or core_usernote
+    if sender.name == 'core':
+        ensure_index(connections[using], repair_only=True)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Again after commit, in case a request re-cached the old row meanwhile
+    authentication.invalidate(instance.pk)
+    transaction.on_commit(lambda: authentication.invalidate(instance.pk))
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    metrics.install(connection)
@@ -0,0 +1,96 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+from itertools import groupby
+from pathlib import Path
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+from .catalogue import current_generation
+from .models import Question
+from .serializers import QuestionSerializer
+
+# Question sets are pre-serialized with QuestionSerializer (the same shape
+# as /api/questions/<topic_id>/), gzipped, and written under a content hash
+# so their URLs can be cached forever. manifest.json maps set names to the
+# current files.
+MANIFEST = 'manifest.json'
+FILE_RE = re.compile(r'^(?P<name>[\w-]+)\.(?P<hash>[0-9a-f]{16})\.json\.gz$')
+
+
+def snapshot_root():
+    return Path(settings.SNAPSHOT_ROOT)
+
+
+def _write_atomic(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _write_set(root, name, questions):
+    body = JSONRenderer().render(QuestionSerializer(questions, many=True).data)
+    digest = hashlib.sha256(body).hexdigest()[:16]
+    filename = f'{name}.{digest}.json.gz'
+    path = root / filename
+    if not path.exists():
+        # mtime=0 keeps the gzip bytes identical for identical content
+        _write_atomic(path, gzip.compress(body, compresslevel=9, mtime=0))
+    return {
+        'file': filename,
+        'count': len(questions),
+        'size': path.stat().st_size,
+        'raw_size': len(body),
+    }
+
+
+def build_snapshots(prune=True):
+    # One set per topic and one per subject. Returns the new manifest.
+    root = snapshot_root()
+    root.mkdir(parents=True, exist_ok=True)
+    generation = current_generation()
+
+    questions = list(
+        Question.objects.select_related('topic').order_by('topic__subject_id', 'topic_id', 'id')
+    )
+    sets = {}
+    for subject_id, subject_questions in groupby(questions, key=lambda q: q.topic.subject_id):
+        subject_questions = list(subject_questions)
+        sets[f'subject-{subject_id}'] = _write_set(root, f'subject-{subject_id}', subject_questions)
+        for topic_id, topic_questions in groupby(subject_questions, key=lambda q: q.topic_id):
+            sets[f'topic-{topic_id}'] = _write_set(root, f'topic-{topic_id}', list(topic_questions))
+
+    manifest = {'generation': generation, 'sets': sets}
+    _write_atomic(root / MANIFEST, json.dumps(manifest, indent=1).encode())
+
+    if prune:
+        current = {entry['file'] for entry in sets.values()}
+        for path in root.iterdir():
+            if FILE_RE.match(path.name) and path.name not in current:
+                path.unlink()
+    return manifest
+
+
+def read_manifest():
+    try:
+        return json.loads((snapshot_root() / MANIFEST).read_bytes())
+    except FileNotFoundError:
+        return {'generation': None, 'sets': {}}
+
+
+def snapshot_path(filename):
+    # None unless `filename` names a snapshot file that exists
+    if not FILE_RE.match(filename):
+        return None
+    path = snapshot_root() / filename
+    return path if path.exists() else None
@@ -0,0 +1,81 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils.http import parse_etags, quote_etag
+
+from .models import UserStorage, UserStorageEntry
+
+MAX_KEY_LENGTH = UserStorageEntry._meta.get_field('key').max_length
+
+
+class VersionConflict(Exception):
+    def __init__(self, version):
+        super().__init__(f"storage is at version {version}")
+        self.version = version
+
+
+def is_valid_document(data):
+    return isinstance(data, dict) and all(len(key) <= MAX_KEY_LENGTH for key in data)
+
+
+def etag_for(version):
+    return quote_etag(str(version))
+
+
+def matches(if_match, version):
+    # If-Match header value against the current version ('*' always matches)
+    etags = parse_etags(if_match)
+    return '*' in etags or str(version) in (tag.removeprefix('W/').strip('"') for tag in etags)
+
+
+def get_version(user):
+    header, _ = UserStorage.objects.get_or_create(user=user)
+    return header.version
+
+
+def read_document(user, keys=None):
+    entries = UserStorageEntry.objects.filter(user=user)
+    if keys is not None:
+        entries = entries.filter(key__in=keys)
+    return dict(entries.values_list('key', 'value'))
+
+
+def read_key(user, key, default=None):
+    value = UserStorageEntry.objects.filter(user=user, key=key).values_list('value', flat=True).first()
+    return default if value is None else value
+
+
+def _write(user, if_match, write):
+    # Runs `write()` with the user's storage header locked and returns the new
+    # version. Raises VersionConflict when If-Match doesn't name the current one.
+    with transaction.atomic():
+        UserStorage.objects.get_or_create(user=user)
+        header = UserStorage.objects.select_for_update().get(user=user)
+        if if_match is not None and not matches(if_match, header.version):
+            raise VersionConflict(header.version)
+        write()
+        UserStorage.objects.filter(pk=header.pk).update(version=F('version') + 1)
+        return header.version + 1
+
+
+def _upsert(user, delta):
+    # Upserts only the given top-level keys, in a single statement
+    if not delta:
+        return
+    UserStorageEntry.objects.bulk_create(
+        [UserStorageEntry(user=user, key=key, value=value) for key, value in delta.items()],
+        update_conflicts=True,
+        unique_fields=['user', 'key'],
+        update_fields=['value', 'updated_at'],
+    )
+
+
+def patch_document(user, delta, if_match=None):
+    return _write(user, if_match, lambda: _upsert(user, delta))
+
+
+def replace_document(user, document, if_match=None):
+    def write():
+        UserStorageEntry.objects.filter(user=user).exclude(key__in=list(document)).delete()
+        _upsert(user, document)
+
+    return _write(user, if_match, write)
@@ -0,0 +1,58 @@
+import base64
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import StudyLog, StudyLogTombstone
+
+# Rows are stamped with their save time but only become visible at commit,
+# so each delta re-reads a short window before the token. Clients upsert by
+# id, which makes the overlap harmless.
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+class InvalidSyncToken(ValueError):
+    pass
+
+
+def encode_token(moment):
+    return base64.urlsafe_b64encode(moment.isoformat().encode()).decode()
+
+
+def decode_token(token):
+    try:
+        moment = parse_datetime(base64.urlsafe_b64decode(token.encode()).decode())
+    except (ValueError, TypeError):
+        raise InvalidSyncToken(token)
+    if moment is None or timezone.is_naive(moment):
+        raise InvalidSyncToken(token)
+    return moment
+
+
+def tombstone_cutoff():
+    return timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+
+
+def study_log_changes(user, since=None):
+    # Returns (changed logs, deleted ids, next token, reset). Without `since`,
+    # or when it predates the tombstone retention window, the full set is
+    # returned with reset=True and the client replaces its copy.
+    now = timezone.now()
+    logs = StudyLog.objects.filter(user=user).order_by('-date', '-id')
+    if since is None or since < tombstone_cutoff():
+        return list(logs), [], encode_token(now), True
+
+    window = since - SYNC_OVERLAP
+    changed = list(logs.filter(updated_at__gte=window))
+    deleted = list(
+        StudyLogTombstone.objects.filter(user=user, deleted_at__gte=window)
+        .values_list('log_id', flat=True).distinct()
+    )
+    return changed, deleted, encode_token(now), False
+
+
+def purge_tombstones(before=None):
+    deleted, _ = StudyLogTombstone.objects.filter(deleted_at__lt=before or tombstone_cutoff()).delete()
+    return deleted
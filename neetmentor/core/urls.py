@@ -2,10 +2,12 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     RegisterView, SubjectListView, TopicListView,
-    QuestionListView, SubmitAnswerView,
+    QuestionListView, SubmitAnswerView, BulkSubmitAnswerView,
     MockTestResultViewSet, StudyLogViewSet, UserNoteViewSet, StudyTaskViewSet,
     UserStorageView, TaskHistoryViewSet, MeView, UserProfileView, QuizAttemptViewSet,
-    VerifyOTPView, AnalyticsView, GoogleLoginView
+    VerifyOTPView, AnalyticsView, GoogleLoginView, HistoryFeedView,
+    BlobUploadView, BlobView, EventTicketView, event_stream, QuestionSetListView, QuestionSetFileView,
+    QuizGenerateView, QuestionSearchView, NoteSearchView
 )
 
 router = DefaultRouter()
@@ -26,8 +28,19 @@ urlpatterns = [
     path('topics/', TopicListView.as_view(), name='topic-search'),
     path('topics/<int:subject_id>/', TopicListView.as_view(), name='topic-list'),
     path('questions/<int:topic_id>/', QuestionListView.as_view(), name='question-list'),
+    path('question-sets/', QuestionSetListView.as_view(), name='question-sets'),
+    path('question-sets/<str:filename>/', QuestionSetFileView.as_view(), name='question-set-file'),
+    path('quiz/generate/', QuizGenerateView.as_view(), name='quiz-generate'),
+    path('search/questions/', QuestionSearchView.as_view(), name='search-questions'),
+    path('search/notes/', NoteSearchView.as_view(), name='search-notes'),
     path('submit-answer/', SubmitAnswerView.as_view(), name='submit-answer'),
+    path('submit-answers/', BulkSubmitAnswerView.as_view(), name='submit-answers'),
     path('user-storage/', UserStorageView.as_view(), name='user-storage'),
     path('analytics-data/', AnalyticsView.as_view(), name='analytics-data'),
+    path('history/', HistoryFeedView.as_view(), name='history'),
+    path('blobs/', BlobUploadView.as_view(), name='blob-upload'),
+    path('blobs/<str:sha256>/', BlobView.as_view(), name='blob-detail'),
+    path('events/', event_stream, name='events'),
+    path('events/ticket/', EventTicketView.as_view(), name='events-ticket'),
     path('', include(router.urls)),
 ]
@@ -1,42 +1,61 @@
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from asgiref.sync import sync_to_async
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils.http import parse_etags, quote_etag
 from rest_framework import generics, permissions, status, serializers
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from .models import Subject, Topic, Question, UserAttempt, UserProgress, MockTestResult, StudyLog, UserNote, StudyTask, UserStorage, QuizAttempt
+from .models import Subject, Topic, Question, UserAttempt, UserProgress, MockTestResult, StudyLog, UserNote, StudyTask, UserStorage, QuizAttempt, Blob
+from . import analytics, blobs, catalogue, events, hashing, metrics, outbox, quiz, search, snapshots, storage, sync
+from .answers import record_answers
+from .pagination import OptInCursorPagination
+from .history import FEED_SOURCES, InvalidCursor, feed_page
 from .serializers import (
     UserSerializer, RegisterSerializer, SubjectSerializer, 
     TopicSerializer, QuestionSerializer, UserAttemptSerializer,
     MockTestResultSerializer, StudyLogSerializer, UserNoteSerializer,
-    UserNoteSerializer, StudyTaskSerializer, QuizAttemptSerializer
+    UserNoteSerializer, StudyTaskSerializer, QuizAttemptSerializer,
+    BulkAnswerSerializer, UserNoteSummarySerializer, blob_url
 )
 from rest_framework import viewsets
+from rest_framework.decorators import action
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
-from django.core.mail import send_mail
-from django.db.models import Sum, Avg, Count
-from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Sum, Avg, Count, Exists, OuterRef
+import gzip
+import hashlib
 import secrets
+from copy import copy
 from datetime import datetime, timedelta
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView
-import resend
+from rest_framework.utils.urls import replace_query_param
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils import timezone
+from datetime import timezone as dt_timezone
 from django.conf import settings
 
 
 User = get_user_model()
-from .models import PreRegistration
+from .models import PreRegistration, preregistration_expiry
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     def validate(self, attrs):
         username = attrs.get('username')
-        # Check if user is in PreRegistration table
-        if not User.objects.filter(username=username).exists():
-            if PreRegistration.objects.filter(email=username).exists():
-                raise serializers.ValidationError({
-                    "non_field_errors": ["Your email is not verified yet. Please check your inbox."]
-                })
+        # Unexpired pending registration without a real User yet: one
+        # query, and no password hash spent on it
+        unverified = PreRegistration.objects.filter(email=username, expires_at__gt=timezone.now()).exclude(
+            Exists(User.objects.filter(username=OuterRef('email')))
+        )
+        if unverified.exists():
+            raise serializers.ValidationError({
+                "non_field_errors": ["Your email is not verified yet. Please check your inbox."]
+            })
         return super().validate(attrs)
 
 class LoginView(TokenObtainPairView):
@@ -65,7 +84,7 @@ class UserProfileView(APIView):
         user = request.user
         if 'first_name' in request.data:
             user.first_name = request.data['first_name']
-            user.save()
+            user.save(update_fields=['first_name'])
         return Response({"status": "updated", "first_name": user.first_name})
 
 class RegisterView(APIView):
@@ -83,51 +102,43 @@ class RegisterView(APIView):
         if User.objects.filter(email=email).exists():
             return Response({"email": ["A user with this email already exists."]}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Create or Update PreRegistration (Cleanup old attempts)
-        PreRegistration.objects.filter(email=email).delete()
-        
         # Generate 6-digit OTP
         otp = "".join([str(secrets.randbelow(10)) for _ in range(6)])
+        try:
+            encoded = hashing.make_password(password)
+        except hashing.HashingBusy as exc:
+            return Response({"error": exc.detail}, status=exc.status_code, headers={"Retry-After": str(exc.wait)})
         
-        PreRegistration.objects.create(
-            email=email,
-            first_name=first_name,
-            password=make_password(password), 
-            otp_code=otp
-        )
-
-        self.send_verification_email(email, first_name, otp)
+        expires_at = preregistration_expiry()
+        with transaction.atomic():
+            # A resend updates the pending row in place and restarts its expiry
+            PreRegistration.objects.update_or_create(
+                email=email,
+                defaults={
+                    'first_name': first_name,
+                    'password': encoded,
+                    'otp_code': otp,
+                    'expires_at': expires_at,
+                },
+            )
+            self.send_verification_email(email, first_name, otp, expires_at)
         return Response({"message": "OTP sent to your email."}, status=status.HTTP_201_CREATED)
 
-    def send_verification_email(self, email, first_name, otp):
+    def send_verification_email(self, email, first_name, otp, expires_at):
         # Email with OTP Code
         print("\n" + "="*50)
         print(f"VERIFICATION OTP: {otp}")
         print("="*50 + "\n")
 
-        if settings.RESEND_API_KEY:
-            try:
-                resend.api_key = settings.RESEND_API_KEY
-                params = {
-                    "from": settings.DEFAULT_FROM_EMAIL,
-                    "to": [email],
-                    "subject": "Your Verification Code - NEETMentor",
-                    "html": f"<p>Hi {first_name},</p><p>Your 6-digit verification code is: <strong>{otp}</strong></p><p>Please enter this code on the website to complete your registration.</p>",
-                }
-                resend.Emails.send(params)
-            except Exception as e:
-                print(f"ERROR: Resend failed to send email: {e}")
-                # Don't raise the error, let the user proceed to OTP page 
-                # They can still grab the OTP from logs if needed
-        else:
-            # Fallback for local development if no API key
-            send_mail(
-                'Your Verification Code - NEETMentor',
-                f'Hi {first_name},\n\nYour 6-digit verification code is: {otp}\n\nPlease enter this code on the website to complete your registration.',
-                settings.DEFAULT_FROM_EMAIL,
-                [email],
-                fail_silently=False,
-            )
+        # Queued only; the send_outbox worker talks to Resend / SMTP
+        outbox.enqueue(
+            email,
+            'Your Verification Code - NEETMentor',
+            f'Hi {first_name},\n\nYour 6-digit verification code is: {otp}\n\nPlease enter this code on the website to complete your registration.',
+            html_body=f"<p>Hi {first_name},</p><p>Your 6-digit verification code is: <strong>{otp}</strong></p><p>Please enter this code on the website to complete your registration.</p>",
+            supersede_key=f'verification-otp:{email}',
+            expires_at=expires_at,
+        )
 
 class VerifyOTPView(APIView):
     permission_classes = (permissions.AllowAny,)
@@ -145,6 +156,8 @@ class VerifyOTPView(APIView):
                 pending = PreRegistration.objects.get(email=email)
             else:
                 pending = PreRegistration.objects.get(email=email, otp_code=otp)
+            if pending.expires_at <= timezone.now():
+                return Response({"error": "This verification code has expired. Please register again to get a new one."}, status=status.HTTP_400_BAD_REQUEST)
             
             # Create user
             user = User.objects.create(
@@ -200,14 +213,35 @@ class GoogleLoginView(APIView):
             }
         })
 
-class SubjectListView(generics.ListAPIView):
+class CatalogueCacheMixin:
+    # List views over the admin-edited catalogue. Responses are cached per
+    # URL under the current catalogue generation and carry a strong ETag,
+    # so an unchanged catalogue costs one generation lookup (or a 304).
+    def list(self, request, *args, **kwargs):
+        generation = catalogue.current_generation()
+        cache = catalogue.cache()
+        key = catalogue.cache_key(generation, request.get_full_path())
+        entry = cache.get(key)
+        if entry is None:
+            data = super().list(request, *args, **kwargs).data
+            etag = quote_etag(f"{generation}-{hashlib.sha256(JSONRenderer().render(data)).hexdigest()[:32]}")
+            entry = (etag, data)
+            cache.set(key, entry)
+
+        etag, data = entry
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(data, headers=headers)
+
+class SubjectListView(CatalogueCacheMixin, generics.ListAPIView):
     serializer_class = SubjectSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_queryset(self):
         return Subject.objects.filter()
 
-class TopicListView(generics.ListAPIView):
+class TopicListView(CatalogueCacheMixin, generics.ListAPIView):
     serializer_class = TopicSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
@@ -226,12 +260,14 @@ class TopicListView(generics.ListAPIView):
 class TaskHistoryViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = StudyTaskSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         # Returns all tasks for user, newest first
         return StudyTask.objects.filter(user=self.request.user).order_by('-created_at')
 
-class QuestionListView(generics.ListAPIView):
+class QuestionListView(CatalogueCacheMixin, generics.ListAPIView):
     serializer_class = QuestionSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
@@ -239,6 +275,128 @@ class QuestionListView(generics.ListAPIView):
         topic_id = self.kwargs['topic_id']
         return Question.objects.filter(topic_id=topic_id)
 
+class QuestionSetListView(APIView):
+    # Precompiled question sets (see core.snapshots and the
+    # build_question_snapshots command)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request):
+        manifest = snapshots.read_manifest()
+        return Response({
+            "generation": manifest['generation'],
+            "stale": manifest['generation'] != catalogue.current_generation(),
+            "sets": {
+                name: {
+                    "url": request.build_absolute_uri(reverse('question-set-file', args=[entry['file']])),
+                    "count": entry['count'],
+                    "size": entry['size']
+                }
+                for name, entry in manifest['sets'].items()
+            }
+        })
+
+class QuestionSetFileView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request, filename):
+        path = snapshots.snapshot_path(filename)
+        if path is None:
+            raise Http404("Unknown question set")
+
+        # The file name carries the content hash, so it never changes
+        headers = {
+            'ETag': quote_etag(filename),
+            'Cache-Control': 'private, max-age=31536000, immutable',
+            'Vary': 'Accept-Encoding',
+        }
+        if quote_etag(filename) in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        elif 'gzip' in request.headers.get('Accept-Encoding', ''):
+            response = FileResponse(open(path, 'rb'), content_type='application/json')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(gzip.decompress(path.read_bytes()), content_type='application/json')
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+class QuizGenerateView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+    max_count = 200
+    default_mistake_share = 0.3
+
+    def get(self, request):
+        # ?count=&subject=&topic=1,2&difficulty=&mistake_share=0..1
+        params = request.query_params
+        try:
+            count = int(params.get('count', 20))
+            topic_ids = [int(t) for t in params.get('topic', '').split(',') if t.strip()]
+            mistake_share = float(params.get('mistake_share', self.default_mistake_share))
+        except ValueError:
+            return Response({"error": "count, topic and mistake_share must be numeric"}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= count <= self.max_count or not 0 <= mistake_share <= 1:
+            return Response({"error": f"count must be 1-{self.max_count} and mistake_share 0-1"}, status=status.HTTP_400_BAD_REQUEST)
+
+        condition = quiz.question_filter(params.get('subject'), topic_ids, params.get('difficulty'))
+        questions, review = quiz.generate_quiz(request.user, count, condition, mistake_share)
+        data = QuestionSerializer(questions, many=True).data
+        for item in data:
+            item['review'] = item['id'] in review
+        return Response({"count": len(data), "review_count": len(review), "questions": data})
+
+class SearchView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+    max_limit = 50
+
+    def parse(self, request):
+        # (query, limit) or an error Response
+        text = request.query_params.get('q', '').strip()
+        try:
+            limit = int(request.query_params.get('limit', 20))
+        except ValueError:
+            limit = 0
+        if not text or not 1 <= limit <= self.max_limit:
+            return Response({"error": f"q is required and limit must be 1-{self.max_limit}"}, status=status.HTTP_400_BAD_REQUEST)
+        return text, limit
+
+class QuestionSearchView(SearchView):
+    def get(self, request):
+        # ?q=&topic=1,2&subject=&limit=
+        parsed = self.parse(request)
+        if isinstance(parsed, Response):
+            return parsed
+        text, limit = parsed
+        try:
+            topic_ids = [int(t) for t in request.query_params.get('topic', '').split(',') if t.strip()] or None
+        except ValueError:
+            return Response({"error": "topic must be numeric"}, status=status.HTTP_400_BAD_REQUEST)
+        subject = request.query_params.get('subject')
+        if subject:
+            topics = Topic.objects.filter(subject_id=int(subject)) if subject.isdigit() else Topic.objects.filter(subject__name__iexact=subject)
+            if topic_ids:
+                topics = topics.filter(id__in=topic_ids)
+            topic_ids = list(topics.values_list('id', flat=True))
+
+        questions = search.search_questions(text, topic_ids, limit)
+        data = QuestionSerializer(questions, many=True).data
+        for item, question in zip(data, questions):
+            item['rank'] = question.rank
+        return Response({"count": len(data), "results": data})
+
+class NoteSearchView(SearchView):
+    def get(self, request):
+        # ?q=&limit=; results use the grid projection
+        parsed = self.parse(request)
+        if isinstance(parsed, Response):
+            return parsed
+        text, limit = parsed
+        queryset = UserNoteSummarySerializer.setup_queryset(UserNote.objects.filter(user=request.user))
+        notes = search.search_notes(request.user, text, queryset, limit)
+        data = UserNoteSummarySerializer(notes, many=True, context={'request': request}).data
+        for item, note in zip(data, notes):
+            item['rank'] = note.rank
+        return Response({"count": len(data), "results": data})
+
 class SubmitAnswerView(APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
@@ -246,46 +404,41 @@ class SubmitAnswerView(APIView):
         question_id = request.data.get('question_id')
         selected_option = request.data.get('selected_option')
         
-        question = get_object_or_404(Question, id=question_id)
-        is_correct = (selected_option == question.correct_option)
-        
-        # Save Attempt
-        attempt = UserAttempt.objects.create(
-            user=request.user,
-            question=question,
-            selected_option=selected_option,
-            is_correct=is_correct
-        )
-        
-        # Update Progress logic
-        if is_correct:
-            # Check if already solved
-            already_solved = UserAttempt.objects.filter(
-                user=request.user, 
-                question=question, 
-                is_correct=True
-            ).count() > 1
-            
-            if not already_solved:
-                progress, created = UserProgress.objects.get_or_create(
-                    user=request.user,
-                    topic=question.topic
-                )
-                progress.questions_solved += 1
-                
-                total_topic_questions = Question.objects.filter(topic=question.topic).count()
-                progress.percentage = (progress.questions_solved / total_topic_questions) * 100
-                progress.save()
+        question = get_object_or_404(Question.objects.select_related('topic'), id=question_id)
+        result = record_answers(request.user, {question.id: question}, [(question.id, selected_option)])[0]
 
         return Response({
-            "is_correct": is_correct,
-            "correct_option": question.correct_option,
-            "explanation": question.explanation
+            "is_correct": result["is_correct"],
+            "correct_option": result["correct_option"],
+            "explanation": result["explanation"]
+        })
+
+class BulkSubmitAnswerView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        serializer = BulkAnswerSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        answers = [(a['question_id'], a['selected_option']) for a in serializer.validated_data['answers']]
+
+        # One query for every question in the submission
+        questions = Question.objects.select_related('topic').in_bulk({question_id for question_id, _ in answers})
+        missing = sorted({question_id for question_id, _ in answers} - questions.keys())
+        if missing:
+            return Response({"error": "Unknown questions", "question_ids": missing}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = record_answers(request.user, questions, answers)
+        return Response({
+            "results": results,
+            "correct": sum(1 for r in results if r["is_correct"]),
+            "total": len(results)
         })
 
 class MockTestResultViewSet(viewsets.ModelViewSet):
     serializer_class = MockTestResultSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ('-date', '-id')
 
     def get_queryset(self):
         return MockTestResult.objects.filter(user=self.request.user)
@@ -296,26 +449,107 @@ class MockTestResultViewSet(viewsets.ModelViewSet):
 class StudyLogViewSet(viewsets.ModelViewSet):
     serializer_class = StudyLogSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ('-date', '-id')
 
     def get_queryset(self):
         return StudyLog.objects.filter(user=self.request.user)
 
+    def publish(self, data):
+        events.publish(self.request.user.pk, 'study_log', data, self.request.headers.get('X-Client-Id'))
+
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        log = serializer.save(user=self.request.user)
+        analytics.record_study_log(self.request.user, log)
+        self.publish({"changed": [serializer.data], "deleted": []})
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        # Materialise the rollup first so the delta applies to pre-update totals
+        analytics.get_rollup(self.request.user)
+        previous = copy(serializer.instance)
+        log = serializer.save()
+        analytics.record_study_log(self.request.user, previous, sign=-1)
+        analytics.record_study_log(self.request.user, log)
+        self.publish({"changed": [serializer.data], "deleted": []})
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        log_id = instance.id
+        instance.delete()
+        analytics.record_study_log(self.request.user, instance, sign=-1)
+        self.publish({"changed": [], "deleted": [log_id]})
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        # Delta sync: pass back the previous response's sync_token (or an
+        # ISO `updated_since`) to get only logs changed or deleted since then
+        token = request.query_params.get('sync_token')
+        updated_since = request.query_params.get('updated_since')
+        try:
+            if token:
+                since = sync.decode_token(token)
+            elif updated_since:
+                since = parse_datetime(updated_since)
+                if since is None:
+                    raise sync.InvalidSyncToken(updated_since)
+                if timezone.is_naive(since):
+                    since = timezone.make_aware(since, dt_timezone.utc)
+            else:
+                since = None
+        except (sync.InvalidSyncToken, ValueError):
+            return Response({"error": "Invalid sync_token or updated_since"}, status=status.HTTP_400_BAD_REQUEST)
+
+        changed, deleted, next_token, reset = sync.study_log_changes(request.user, since)
+        return Response({
+            "changed": StudyLogSerializer(changed, many=True).data,
+            "deleted": deleted,
+            "sync_token": next_token,
+            "reset": reset
+        })
 
 class UserNoteViewSet(viewsets.ModelViewSet):
     serializer_class = UserNoteSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ('-created_at', '-id')
 
-    def get_queryset(self):
-        return UserNote.objects.filter(user=self.request.user)
+    def is_summary(self):
+        # ?view=summary returns the lightweight grid projection
+        return self.action == 'list' and self.request.query_params.get('view') == 'summary'
 
+    def get_queryset(self):
+        queryset = UserNote.objects.filter(user=self.request.user)
+        if self.is_summary():
+            queryset = UserNoteSummarySerializer.setup_queryset(queryset)
+        return queryset
+
+    def get_serializer_class(self):
+        return UserNoteSummarySerializer if self.is_summary() else UserNoteSerializer
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        # The grid only needs thumbnails; a single note returns the original
+        if self.action == 'list':
+            context['image_variant'] = 'thumb'
+        return context
+
+    @transaction.atomic
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+        analytics.record_note(self.request.user)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
+        analytics.record_note(self.request.user, sign=-1)
 
 class StudyTaskViewSet(viewsets.ModelViewSet):
     serializer_class = StudyTaskSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         return StudyTask.objects.filter(user=self.request.user)
@@ -327,125 +561,243 @@ class UserStorageView(APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     def get(self, request):
-        storage, created = UserStorage.objects.get_or_create(user=request.user)
-        return Response(storage.data)
+        # Read the version first: if a write lands in between, the ETag is
+        # older than the body and the client's next If-Match write gets a 412.
+        version = storage.get_version(request.user)
+        # ?keys=theme,timer_state returns only those top-level keys
+        keys = request.query_params.get('keys')
+        if keys is not None:
+            keys = [key.strip() for key in keys.split(',') if key.strip()]
+        document = storage.read_document(request.user, keys=keys)
+        return Response(document, headers={'ETag': storage.etag_for(version)})
 
     def post(self, request):
-        storage, created = UserStorage.objects.get_or_create(user=request.user)
-        storage.data = request.data
-        storage.save()
-        return Response(storage.data)
+        return self.write(request, storage.replace_document)
 
     def patch(self, request):
-        storage, created = UserStorage.objects.get_or_create(user=request.user)
-        if isinstance(request.data, dict):
-            # Ensure storage.data is a dict (JSONField default is dict but safekeeping)
-            if not isinstance(storage.data, dict):
-                storage.data = {}
-            storage.data.update(request.data)
-            storage.save()
-        return Response(storage.data)
+        # Only the keys in the request body are written; the response echoes
+        # them rather than re-reading the whole document.
+        return self.write(request, storage.patch_document)
+
+    def write(self, request, write_document):
+        if not storage.is_valid_document(request.data):
+            return Response({"error": "Storage document must be a JSON object with keys of at most 255 characters"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            version = write_document(request.user, request.data, if_match=request.headers.get('If-Match'))
+        except storage.VersionConflict as conflict:
+            return Response(
+                {"error": "Storage was modified by another session", "version": conflict.version},
+                status=status.HTTP_412_PRECONDITION_FAILED,
+                headers={'ETag': storage.etag_for(conflict.version)},
+            )
+        if 'timer_state' in request.data:
+            # Other sessions of this user follow the timer live
+            events.publish(request.user.pk, 'timer_state', request.data['timer_state'], request.headers.get('X-Client-Id'))
+        return Response(request.data, headers={'ETag': storage.etag_for(version)})
 
 class QuizAttemptViewSet(viewsets.ModelViewSet):
     serializer_class = QuizAttemptSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = OptInCursorPagination
+    cursor_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         # Fix: Filter by current user to prevent data leak
         return QuizAttempt.objects.filter(user=self.request.user)
 
+    @transaction.atomic
     def perform_create(self, serializer):
         # Fix: Automatically assign attempt to current user
-        serializer.save(user=self.request.user)
+        attempt = serializer.save(user=self.request.user)
+        analytics.record_quiz_attempt(self.request.user, attempt)
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        # Materialise the rollup first so the delta applies to pre-update totals
+        analytics.get_rollup(self.request.user)
+        previous = copy(serializer.instance)
+        attempt = serializer.save()
+        analytics.record_quiz_attempt(self.request.user, previous, sign=-1)
+        analytics.record_quiz_attempt(self.request.user, attempt)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
+        analytics.record_quiz_attempt(self.request.user, instance, sign=-1)
 
 class AnalyticsView(APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     def get(self, request):
-        user = request.user
-        
-        # 1. Overall Stats
-        total_questions = QuizAttempt.objects.filter(user=user).aggregate(Sum('total_questions'))['total_questions__sum'] or 0
-        correct_answers = QuizAttempt.objects.filter(user=user).aggregate(Sum('correct_answers'))['correct_answers__sum'] or 0
-        
-        # Accuracy
-        accuracy = (correct_answers / total_questions * 100) if total_questions > 0 else 0
-        
-        # Study Time
-        total_minutes = StudyLog.objects.filter(user=user).aggregate(Sum('minutes'))['minutes__sum'] or 0
-        study_hours = round(total_minutes / 60, 1)
-        
-        # Syllabus Progress (from UserStorage)
-        storage, _ = UserStorage.objects.get_or_create(user=user)
-        syllabus_data = storage.data.get('syllabus', {})
-        total_topics = 0
-        completed_topics = 0
-        for subj_data in syllabus_data.values():
-            if isinstance(subj_data, dict):
-                for topic_status in subj_data.values():
-                    total_topics += 1
-                    if topic_status == 'completed':
-                        completed_topics += 1
-        
-        syllabus_percent = (completed_topics / total_topics * 100) if total_topics > 0 else 0
-
-        # 2. Intelligence Score Logic
-        # Formula: (Accuracy * 4) + (Questions / 10) + (Hours / 2)
-        base_score = 300 # Starting score
-        earned_score = (accuracy * 4) + (total_questions / 10) + (study_hours / 2)
-        intelligence_score = min(720, base_score + int(earned_score))
-
-        # 3. Daily Activity (Last 7 Days)
-        days = []
-        for i in range(6, -1, -1):
-            date = (datetime.now() - timedelta(days=i)).date()
-            daily_mins = StudyLog.objects.filter(user=user, date=date).aggregate(Sum('minutes'))['minutes__sum'] or 0
-            days.append({
-                "day": date.strftime("%a"),
-                "hours": round(daily_mins / 60, 1)
-            })
+        return Response(analytics.compute_analytics(request.user))
 
-        # 4. Subject Mastery
-        subjects = ['Physics', 'Chemistry', 'Biology']
-        subject_mastery = []
-        for sub in subjects:
-            sub_correct = QuizAttempt.objects.filter(user=user, quiz_name__icontains=sub).aggregate(Sum('correct_answers'))['correct_answers__sum'] or 0
-            sub_total = QuizAttempt.objects.filter(user=user, quiz_name__icontains=sub).aggregate(Sum('total_questions'))['total_questions__sum'] or 0
-            sub_acc = (sub_correct / sub_total * 100) if sub_total > 0 else 0
-            
-            # Simple completion logic for mastery card
-            sub_compl = 0
-            if sub in syllabus_data:
-                sub_topics = syllabus_data[sub]
-                if isinstance(sub_topics, dict):
-                    t_count = len(sub_topics)
-                    c_count = sum(1 for status in sub_topics.values() if status == 'completed')
-                    sub_compl = (c_count / t_count * 100) if t_count > 0 else 0
-
-            subject_mastery.append({
-                "subject": sub,
-                "completion": round(sub_compl),
-                "accuracy": round(sub_acc)
-            })
+class HistoryFeedView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+    max_page_size = 200
+
+    def get(self, request):
+        params = request.query_params
+
+        types = [t.strip() for t in params.get('types', '').split(',') if t.strip()]
+        unknown = [t for t in types if t not in FEED_SOURCES]
+        if unknown:
+            return Response({"types": [f"Unknown type: {t}" for t in unknown]}, status=status.HTTP_400_BAD_REQUEST)
+
+        window = {}
+        for name in ('since', 'until'):
+            value = params.get(name)
+            if not value:
+                continue
+            window[name] = self.parse_bound(value)
+            if window[name] is None:
+                return Response({name: ["Expected an ISO date or datetime"]}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = min(int(params.get('page_size', 50)), self.max_page_size)
+        except ValueError:
+            limit = 50
+
+        try:
+            items, next_cursor = feed_page(
+                request.user, types=types, cursor=params.get('cursor'), limit=max(limit, 1), **window
+            )
+        except InvalidCursor:
+            return Response({"cursor": ["Invalid cursor"]}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({
-            "overallStats": [
-                { "label": 'Questions Solved', "value": str(total_questions), "icon": 'Target', "color": '#4F46E5', "trend": f'+{total_questions} total' },
-                { "label": 'Estimated Accuracy', "value": f'{round(accuracy)}%', "icon": 'Award', "color": '#10B981', "trend": 'Stable' },
-                { "label": 'Study Time', "value": f'{study_hours}h', "icon": 'Clock', "color": '#F59E0B', "trend": f'{total_minutes} mins' },
-                { "label": 'Syllabus Done', "value": f'{round(syllabus_percent)}%', "icon": 'BookOpen', "color": '#EF4444', "trend": f'{completed_topics}/{total_topics}' },
-            ],
-            "subjectMastery": subject_mastery,
-            "dailyActivity": days,
-            "intelligenceScore": { 
-                "score": intelligence_score, 
-                "improvement": "Growing consistently", 
-                "gain": round(earned_score)
-            },
-            "health": {
-                "goalCompletion": round(syllabus_percent),
-                "pyqCoverage": round(accuracy),
-                "notesCount": UserNote.objects.filter(user=user).count(),
-                "streak": 0 # Logic for streak can be added later
-            }
+            "next": replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor) if next_cursor else None,
+            "results": [{"type": kind, "timestamp": ts, "data": data} for kind, ts, data in items],
         })
+
+    def parse_bound(self, value):
+        # Accepts 2026-02-11 (midnight UTC) or a full ISO datetime
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                return None
+            moment = datetime(day.year, day.month, day.day)
+        if timezone.is_naive(moment):
+            moment = moment.replace(tzinfo=dt_timezone.utc)
+        return moment
+
+class BlobUploadView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        # Accepts either a raw body (Content-Type: image/...) or a multipart
+        # "file" field; either way the bytes are streamed to disk in chunks.
+        try:
+            if request.content_type.startswith('multipart/'):
+                upload = request.FILES.get('file')
+                if upload is None:
+                    return Response({"file": ["No file was submitted."]}, status=status.HTTP_400_BAD_REQUEST)
+                blob = blobs.store(upload.chunks(blobs.CHUNK_SIZE), upload.content_type)
+            else:
+                blobs.check_content_type(request.content_type)
+                stream = request.stream
+                chunks = iter(lambda: stream.read(blobs.CHUNK_SIZE), b'') if stream else iter(())
+                blob = blobs.store(chunks, request.content_type)
+        except blobs.BlobError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "sha256": blob.sha256,
+            "size": blob.size,
+            "content_type": blob.content_type,
+            "url": blob_url(request, blob.sha256)
+        }, status=status.HTTP_201_CREATED)
+
+class BlobView(APIView):
+    # Public and immutable: the SHA-256 in the URL is the capability, which
+    # lets <img> tags load it without an Authorization header.
+    permission_classes = (permissions.AllowAny,)
+    authentication_classes = ()
+
+    def get(self, request, sha256):
+        blob = get_object_or_404(Blob, sha256=sha256)
+        path = blobs.blob_path(blob.sha256)
+        if not path.exists():
+            raise Http404("Blob content is missing")
+
+        # ?variant=thumb|preview serves a downscaled WebP rendition, falling
+        # back to the original if it cannot be rendered
+        variant = request.query_params.get('variant')
+        if variant is not None and variant not in blobs.VARIANTS:
+            return Response({"error": f"Unknown variant: {variant}"}, status=status.HTTP_400_BAD_REQUEST)
+        content_type = blob.content_type
+        etag = quote_etag(blob.sha256)
+        variant_path = blobs.ensure_variant(blob.sha256, variant) if variant else None
+        if variant_path is not None:
+            path, content_type = variant_path, blobs.VARIANT_CONTENT_TYPE
+            etag = quote_etag(f'{blob.sha256}.{variant}')
+
+        headers = {
+            'ETag': etag,
+            'Accept-Ranges': 'bytes',
+            'Cache-Control': 'public, max-age=31536000, immutable',
+        }
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+            for name, value in headers.items():
+                response[name] = value
+            return response
+
+        size = path.stat().st_size
+        try:
+            byte_range = blobs.parse_range(request.headers.get('Range'), size)
+        except blobs.BlobError:
+            response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        if byte_range is None:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                blobs.iter_file_range(path, start, end),
+                status=status.HTTP_206_PARTIAL_CONTENT,
+                content_type=content_type,
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(end - start + 1)
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+class EventTicketView(APIView):
+    # Short-lived ticket for opening the event stream (see events.issue_ticket)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        return Response({"ticket": events.issue_ticket(request.user.pk), "expires_in": settings.EVENTS_TICKET_SECONDS})
+
+async def event_stream(request):
+    # Server-sent events for the user's other sessions (timer_state, study
+    # logs). Needs the ASGI server. EventSource cannot set headers, so the
+    # stream is opened with a ticket from EventTicketView in the query string.
+    user_id = events.redeem_ticket(request.GET.get('ticket', ''))
+    if user_id is None or not await User.objects.filter(pk=user_id, is_active=True).aexists():
+        return JsonResponse({"error": "Invalid or expired ticket"}, status=status.HTTP_401_UNAUTHORIZED)
+
+    async def stream():
+        yield 'retry: 5000\n\n'
+        # Ends after EVENTS_STREAM_MINUTES; the client reconnects with a new ticket
+        async for frame in events.listen(user_id, settings.EVENTS_HEARTBEAT_SECONDS, settings.EVENTS_STREAM_MINUTES * 60):
+            yield frame
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def metrics_endpoint(request):
+    # Prometheus scrape target for this process
+    if settings.METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not secrets.compare_digest(supplied, settings.METRICS_TOKEN):
+            return HttpResponse(status=401)
+    elif not settings.DEBUG:
+        raise Http404
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -33,14 +33,19 @@ export default function HistoryPage() {
     const fetchHistoryData = async () => {
         setLoading(true);
         try {
-            // Fetch all data in parallel
-            const [logsRes, tasksRes, notesRes, mocksRes, quizzesRes] = await Promise.all([
-                api.get('/study-logs/'),
-                api.get('/tasks/'),
-                api.get('/notes/'),
-                api.get('/mock-tests/'),
-                api.get('/quiz-attempts/')
-            ]);
+            // One request to the merged history feed. The window is padded by a day on
+            // each side because date-only rows sit at UTC midnight; the exact local-day
+            // filtering happens below.
+            const [year, month, day] = selectedDate.split('-').map(Number);
+            const since = new Date(year, month - 1, day - 1).toISOString();
+            const until = new Date(year, month - 1, day + 2).toISOString();
+            const buckets = { study_log: [], task: [], note: [], mock_test: [], quiz: [] };
+            let res = await api.get('/history/', { params: { since, until, page_size: 200 } });
+            while (true) {
+                res.data.results.forEach(item => buckets[item.type]?.push(item.data));
+                if (!res.data.next) break;
+                res = await api.get(res.data.next);
+            }
 
             // Filter by selected date
             // Note: Some models use 'date' (YYYY-MM-DD), others 'created_at' (ISO timestamp)
@@ -64,11 +69,11 @@ export default function HistoryPage() {
             };
 
             setData({
-                studyLogs: logsRes.data.filter(item => filterByDate(item, 'date')),
-                tasks: tasksRes.data.filter(item => filterByDate(item, 'created_at')),
-                notes: notesRes.data.filter(item => filterByDate(item, 'created_at')),
-                mockTests: mocksRes.data.filter(item => filterByDate(item, 'date')),
-                quizAttempts: quizzesRes.data.filter(item => filterByDate(item, 'created_at'))
+                studyLogs: buckets.study_log.filter(item => filterByDate(item, 'date')),
+                tasks: buckets.task.filter(item => filterByDate(item, 'created_at')),
+                notes: buckets.note.filter(item => filterByDate(item, 'created_at')),
+                mockTests: buckets.mock_test.filter(item => filterByDate(item, 'date')),
+                quizAttempts: buckets.quiz.filter(item => filterByDate(item, 'created_at'))
             });
 
         } catch (error) {
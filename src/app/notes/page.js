@@ -11,11 +11,15 @@ import {
 } from "lucide-react";
 import api, { getCookie } from "@/lib/api";
 
+// The notes list returns thumbnail URLs; larger views ask for the preview
+const previewUrl = (url) => url ? url.replace('variant=thumb', 'variant=preview') : url;
+
 export default function NotesPage() {
     const router = useRouter();
     const [notes, setNotes] = useState([]);
     const [mounted, setMounted] = useState(false);
     const [searchQuery, setSearchQuery] = useState("");
+    const [searchMatches, setSearchMatches] = useState(null); // ids from /search/notes/; null filters locally
     const [activeFilter, setActiveFilter] = useState("All");
 
     // Modal States
@@ -37,9 +41,12 @@ export default function NotesPage() {
             }
 
             try {
-                const res = await api.get('/notes/');
+                // Summary view: title, subject, pin state and a content preview
+                const res = await api.get('/notes/', { params: { view: 'summary' } });
                 const mappedNotes = res.data.map(n => ({
                     ...n,
+                    content: n.content_preview,
+                    isSummary: true,
                     imageUrl: n.image_url,
                     isPinned: n.is_pinned,
                     date: new Date(n.created_at).toLocaleDateString('en-GB')
@@ -56,10 +63,36 @@ export default function NotesPage() {
         fetchNotes();
     }, []);
 
+    // The list only holds previews, so search runs against the full-text index
+    useEffect(() => {
+        const q = searchQuery.trim();
+        if (!q) {
+            setSearchMatches(null);
+            return;
+        }
+        const timer = setTimeout(async () => {
+            try {
+                const res = await api.get('/search/notes/', { params: { q, limit: 50 } });
+                setSearchMatches(new Set(res.data.results.map(n => n.id)));
+            } catch (err) {
+                setSearchMatches(null);
+            }
+        }, 250);
+        return () => clearTimeout(timer);
+    }, [searchQuery]);
+
     // Handle Image Upload
-    const handleImageUpload = (e) => {
+    const handleImageUpload = async (e) => {
         const file = e.target.files[0];
-        if (file) {
+        if (!file) return;
+        try {
+            // Upload the raw bytes once; the note only stores the blob URL
+            const res = await api.post('/blobs/', file, {
+                headers: { 'Content-Type': file.type }
+            });
+            setNewNote(prev => ({ ...prev, imageUrl: res.data.url }));
+        } catch (err) {
+            // Offline / not logged in: fall back to an inline data URL
             const reader = new FileReader();
             reader.onloadend = () => {
                 setNewNote(prev => ({ ...prev, imageUrl: reader.result }));
@@ -144,6 +177,19 @@ export default function NotesPage() {
         }
     };
 
+    // The list only carries a preview; fetch the full note before opening it
+    const withFullNote = async (note, open) => {
+        if (!note.isSummary) return open(note);
+        try {
+            const res = await api.get(`/notes/${note.id}/`);
+            const full = { ...note, ...res.data, imageUrl: note.imageUrl, isSummary: false };
+            setNotes(prev => prev.map(n => n.id === note.id ? full : n));
+            open(full);
+        } catch (err) {
+            console.error("Failed to load note", err);
+        }
+    };
+
     // Open Edit Modal
     const startEditing = (note) => {
         setNewNote({
@@ -236,7 +282,8 @@ export default function NotesPage() {
     if (!mounted) return null;
 
     const filteredNotes = notes.filter(n => {
-        const matchesSearch = n.title.toLowerCase().includes(searchQuery.toLowerCase()) ||
+        const matchesSearch = searchMatches ? searchMatches.has(n.id) :
+            n.title.toLowerCase().includes(searchQuery.toLowerCase()) ||
             n.content.toLowerCase().includes(searchQuery.toLowerCase());
         const matchesFilter = activeFilter === "All" || n.subject === activeFilter;
         return matchesSearch && matchesFilter;
@@ -325,13 +372,13 @@ export default function NotesPage() {
                                 <button className="action-icon delete" onClick={() => deleteNote(note.id)} title="Delete">
                                     <Trash2 size={16} />
                                 </button>
-                                <button className="action-pill" onClick={() => startRevision(note)} title="Flashcard Mode">
+                                <button className="action-pill" onClick={() => withFullNote(note, startRevision)} title="Flashcard Mode">
                                     <Zap size={14} /> Revise
                                 </button>
-                                <button className="action-pill primary" onClick={() => setViewingNote(note)} title="Focus Read">
+                                <button className="action-pill primary" onClick={() => withFullNote(note, setViewingNote)} title="Focus Read">
                                     <BookOpen size={14} /> Read
                                 </button>
-                                <button className="action-icon edit" onClick={() => startEditing(note)} title="Edit">
+                                <button className="action-icon edit" onClick={() => withFullNote(note, startEditing)} title="Edit">
                                     <Edit2 size={16} />
                                 </button>
                             </div>
@@ -460,7 +507,7 @@ export default function NotesPage() {
 
                             {viewingNote.imageUrl && (
                                 <div className="read-image-container">
-                                    <img src={viewingNote.imageUrl} alt={viewingNote.title} className="read-image" />
+                                    <img src={previewUrl(viewingNote.imageUrl)} alt={viewingNote.title} className="read-image" />
                                 </div>
                             )}
 
@@ -487,7 +534,7 @@ export default function NotesPage() {
                                         <div className="back-content">
                                             {revisingNote.imageUrl && (
                                                 <div className="flashcard-image">
-                                                    <img src={revisingNote.imageUrl} alt="Diagram" />
+                                                    <img src={previewUrl(revisingNote.imageUrl)} alt="Diagram" />
                                                 </div>
                                             )}
                                             {revisingNote.content.split('\n').map((line, i) => <p key={i} style={{ marginBottom: '12px' }}>{line}</p>)}
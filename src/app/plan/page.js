@@ -84,7 +84,7 @@ export default function CalendarSystem() {
             // Fetch tasks (from UserStorage) and settings
             const [plannerData, settingsRes] = await Promise.all([
                 loadData('planner_data', {}),
-                api.get('/user-storage/')
+                api.get('/user-storage/', { params: { keys: 'planner_settings' } })
             ]);
 
             setTasksData(plannerData);
@@ -104,10 +104,8 @@ export default function CalendarSystem() {
 
     const saveSettings = async (target) => {
         try {
-            // Get existing storage data to merge
-            const currentDataRes = await api.get('/user-storage/');
-            const merged = { ...currentDataRes.data, planner_settings: { daily_target: target } };
-            await api.post('/user-storage/', merged);
+            // PATCH writes only planner_settings; the rest of storage is untouched
+            await api.patch('/user-storage/', { planner_settings: { daily_target: target } });
         } catch (error) {
             console.error("Failed to save settings:", error);
         }
@@ -13,7 +13,7 @@ export function ThemeProvider({ children }) {
     useEffect(() => {
         const fetchTheme = async () => {
             try {
-                const res = await api.get('/user-storage/');
+                const res = await api.get('/user-storage/', { params: { keys: 'theme' } });
                 const savedTheme = res.data?.theme || "light";
                 setTheme(savedTheme);
                 document.documentElement.setAttribute('data-theme', savedTheme);
@@ -30,8 +30,7 @@ export function ThemeProvider({ children }) {
         setTheme(newTheme);
         document.documentElement.setAttribute('data-theme', newTheme);
         try {
-            const res = await api.get('/user-storage/');
-            await api.post('/user-storage/', { ...res.data, theme: newTheme });
+            await api.patch('/user-storage/', { theme: newTheme });
         } catch (e) { }
     };
 
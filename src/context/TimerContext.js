@@ -1,7 +1,7 @@
 "use client";
 
 import React, { createContext, useContext, useState, useEffect, useRef } from 'react';
-import api, { getCookie } from "@/lib/api";
+import api, { getCookie, CLIENT_ID } from "@/lib/api";
 import { saveData, loadData } from "@/lib/progress";
 
 const TimerContext = createContext();
@@ -30,6 +30,22 @@ export function TimerProvider({ children }) {
 
     const intervalRef = useRef(null);
     const audioRef = useRef(null);
+    const syncTokenRef = useRef(null);
+
+    const streamOpenRef = useRef(false);
+    const remoteStateRef = useRef(null);
+
+    // Merge a /study-logs/changes/ response (or a study_log event) into recentSessions
+    const applyLogChanges = (data) => {
+        if (data.sync_token) syncTokenRef.current = data.sync_token;
+        setRecentSessions(prev => {
+            if (data.reset) return data.changed;
+            if (!data.changed.length && !data.deleted.length) return prev;
+            const deleted = new Set(data.deleted);
+            const changed = new Set(data.changed.map(log => log.id));
+            return [...data.changed, ...prev.filter(s => !deleted.has(s.id) && !changed.has(s.id))];
+        });
+    };
 
     // Helper for Local Date (YYYY-MM-DD)
     const getLocalDate = () => {
@@ -48,14 +64,14 @@ export function TimerProvider({ children }) {
                 const token = getCookie('token');
                 if (token) {
                     setUid('persistent-user'); // Dummy ID for internal state
-                    const res = await api.get('/study-logs/');
-                    // Calculate today's stats from logs
+                    // Full snapshot plus a sync token for the delta polls below
+                    const res = await api.get('/study-logs/changes/');
                     // Store ALL fetched logs for history display
-                    setRecentSessions(res.data);
+                    applyLogChanges(res.data);
 
                     // Calculate today's stats specifically for the progress bar
                     const today = getLocalDate();
-                    const todayLogs = res.data.filter(log => log.date === today);
+                    const todayLogs = res.data.changed.filter(log => log.date === today);
                     const totalSecs = todayLogs.reduce((acc, log) => acc + (log.minutes * 60), 0);
 
                     // Also calculate subject distribution for today from logs
@@ -93,34 +109,39 @@ export function TimerProvider({ children }) {
     useEffect(() => {
         const loadTimerState = async () => {
             try {
-                const res = await api.get('/user-storage/');
+                const res = await api.get('/user-storage/', { params: { keys: 'timer_state' } });
                 const saved = res.data?.timer_state;
-                if (saved) {
-                    const { seconds: s, isActive: active, lastUpdate, mode: m, initialTime: it, subject, isBreak, breakT, pomoCount } = saved;
-                    const now = Date.now();
-                    const elapsed = Math.floor((now - lastUpdate) / 1000);
-
-                    if (active) {
-                        const remaining = Math.max(s - elapsed, 0);
-                        setSeconds(remaining);
-                        setIsActive(remaining > 0);
-                    } else {
-                        setSeconds(s);
-                        setIsActive(false);
-                    }
-                    setMode(m);
-                    setInitialTime(it);
-                    setSelectedSubject(subject);
-                    setIsBreakTime(isBreak || false);
-                    setBreakType(breakT || null);
-                    setPomodoroCount(pomoCount || 0);
-                }
+                if (saved) applyTimerState(saved);
             } catch (e) { }
             hasLoaded.current = true;
         };
         loadTimerState();
     }, []);
 
+    const applyTimerState = (saved) => {
+        const { seconds: s, isActive: active, lastUpdate, mode: m, initialTime: it, subject, isBreak, breakT, pomoCount } = saved;
+        const now = Date.now();
+        const elapsed = Math.floor((now - lastUpdate) / 1000);
+
+        if (active) {
+            const remaining = Math.max(s - elapsed, 0);
+            setSeconds(remaining);
+            setIsActive(remaining > 0);
+        } else {
+            setSeconds(s);
+            setIsActive(false);
+        }
+        setMode(m);
+        setInitialTime(it);
+        setSelectedSubject(subject);
+        setIsBreakTime(isBreak || false);
+        setBreakType(breakT || null);
+        setPomodoroCount(pomoCount || 0);
+    };
+
+    // Remembered so the save effect doesn't echo a state another tab just sent
+    const timerFingerprint = (state) => JSON.stringify({ ...state, lastUpdate: undefined });
+
     // Save timer state to DB (debounced/on change)
     useEffect(() => {
         if (!hasLoaded.current) return;
@@ -136,6 +157,7 @@ export function TimerProvider({ children }) {
                 pomoCount: pomodoroCount,
                 lastUpdate: Date.now()
             };
+            if (remoteStateRef.current === timerFingerprint(state)) return;
             try {
                 await api.patch('/user-storage/', { timer_state: state });
             } catch (e) { }
@@ -176,15 +198,77 @@ export function TimerProvider({ children }) {
         }
     }, [seconds, isActive]);
 
-    // Simplified Stats Listener
+    // Only logs changed or deleted since the last sync
+    const syncLogs = async () => {
+        try {
+            const params = syncTokenRef.current ? { sync_token: syncTokenRef.current } : {};
+            const res = await api.get('/study-logs/changes/', { params });
+            applyLogChanges(res.data);
+        } catch (e) { }
+    };
+
+    // Live updates from the user's other sessions. EventSource can't send the
+    // Authorization header, so each (re)connect first asks for a short-lived
+    // stream ticket; the server ends the stream periodically and a new one
+    // is fetched then.
     useEffect(() => {
-        if (!uid) return;
-        const interval = setInterval(async () => {
+        if (!uid || typeof EventSource === 'undefined') return;
+        let source = null;
+        let retry = null;
+        let closed = false;
+
+        const connect = async () => {
+            let ticket;
             try {
-                const res = await api.get('/study-logs/');
-                setRecentSessions(res.data);
-            } catch (e) { }
-        }, 30000); // Check every 30s
+                ticket = (await api.post('/events/ticket/')).data.ticket;
+            } catch (e) {
+                if (!closed) retry = setTimeout(connect, 5000);
+                return;
+            }
+            if (closed) return;
+            source = new EventSource(`${api.defaults.baseURL}/events/?ticket=${encodeURIComponent(ticket)}`);
+            source.onopen = () => {
+                streamOpenRef.current = true;
+                syncLogs(); // catch up on anything missed while disconnected
+            };
+            source.onerror = () => {
+                streamOpenRef.current = false;
+                source.close();
+                retry = setTimeout(connect, 5000);
+            };
+            source.addEventListener('timer_state', (e) => {
+                const { data, origin } = JSON.parse(e.data);
+                if (origin === CLIENT_ID || !data) return;
+                remoteStateRef.current = timerFingerprint(data);
+                applyTimerState(data);
+            });
+            source.addEventListener('study_log', (e) => {
+                const { data, origin } = JSON.parse(e.data);
+                if (origin === CLIENT_ID) return;
+                applyLogChanges(data);
+            });
+        };
+        connect();
+
+        return () => {
+            closed = true;
+            streamOpenRef.current = false;
+            clearTimeout(retry);
+            if (source) source.close();
+        };
+    }, [uid]);
+
+    // Fallback polling: every 30s while the event stream is down, and every
+    // 5 minutes while it is open in case an event never reached this worker
+    useEffect(() => {
+        if (!uid) return;
+        let lastSync = Date.now();
+        const interval = setInterval(() => {
+            const due = streamOpenRef.current ? 5 * 60000 : 30000;
+            if (Date.now() - lastSync < due) return;
+            lastSync = Date.now();
+            syncLogs();
+        }, 30000);
         return () => clearInterval(interval);
     }, [uid]);
 
@@ -29,6 +29,9 @@ const removeCookie = (name) => {
     document.cookie = name + '=; Path=/; Expires=Thu, 01 Jan 1970 00:00:01 GMT;';
 };
 
+// Identifies this tab, so it can ignore its own echoes on the event stream
+const CLIENT_ID = Math.random().toString(36).slice(2) + Date.now().toString(36);
+
 // Interceptor to add JWT token to every request
 api.interceptors.request.use((config) => {
     if (typeof window !== 'undefined') {
@@ -36,12 +39,13 @@ api.interceptors.request.use((config) => {
         if (token) {
             config.headers.Authorization = `Bearer ${token}`;
         }
+        config.headers['X-Client-Id'] = CLIENT_ID;
     }
     return config;
 }, (error) => {
     return Promise.reject(error);
 });
 
-export { setCookie, getCookie, removeCookie };
+export { setCookie, getCookie, removeCookie, CLIENT_ID };
 
 export default api;
@@ -7,10 +7,8 @@ import api, { getCookie } from "./api";
 // Revised Progress functions using Django UserStorage
 export const saveProgress = async (data) => {
   try {
-    // Fetch existing data first to merge (since server overwrites with request body)
-    const currentDataRes = await api.get('/user-storage/');
-    const merged = { ...currentDataRes.data, progress: data };
-    await api.post('/user-storage/', merged);
+    // PATCH writes only the progress key, so no read-merge-write round trip is needed
+    await api.patch('/user-storage/', { progress: data });
   } catch (e) {
     console.error("Failed to save progress to Django", e);
   }
@@ -18,7 +16,7 @@ export const saveProgress = async (data) => {
 
 export const loadProgress = async () => {
   try {
-    const res = await api.get('/user-storage/');
+    const res = await api.get('/user-storage/', { params: { keys: 'progress' } });
     if (res.data && res.data.progress) {
       return res.data.progress;
     }
@@ -47,7 +45,7 @@ export const loadData = async (feature, defaultData = {}) => {
   if (!token) return defaultData;
 
   try {
-    const res = await api.get('/user-storage/');
+    const res = await api.get('/user-storage/', { params: { keys: feature } });
     if (res.data && res.data[feature]) {
       return res.data[feature];
     }